@@ -0,0 +1,187 @@
+from sqlalchemy import select, func, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, DownloadDay, DownloadMonth, DownloadableForm
+from collections import Counter
+from datetime import datetime, date, timedelta
+
+# Downloads are stored per form per day (DownloadDay) and per month
+# (DownloadMonth), both written by the batched download counter. Totals over a
+# window read whole months from the monthly rollup and only the partial months
+# at either end from the daily rows. Series are bucketed from the daily rows:
+# a year of one form's history is at most 366 rows, read from the primary key.
+
+PERIODS = ('day', 'week', 'month')
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 731
+
+
+class AnalyticsError(ValueError):
+    """Raised for invalid analytics query parameters (reported as 400)"""
+
+
+# ==================== RECORDING ====================
+
+def upsert_statement(bind, model):
+    """INSERT ... ON CONFLICT (primary key) DO UPDATE SET count = count + excluded.count"""
+    dialect = postgresql if bind.dialect.name == 'postgresql' else sqlite
+    table = model.__table__
+    stmt = dialect.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key),
+        set_={'count': table.c.count + stmt.excluded['count']}
+    )
+
+
+def record_days(counts):
+    """Add {(form_id, day): n} to the daily and monthly rows, one executemany upsert each"""
+    # Skip forms deleted since they were counted, which the foreign key would reject
+    form_ids = {form_id for form_id, day in counts}
+    existing = set(db.session.scalars(select(DownloadableForm.id).where(DownloadableForm.id.in_(form_ids))))
+    counts = {key: n for key, n in counts.items() if key[0] in existing}
+    if not counts:
+        return
+
+    months = Counter()
+    for (form_id, day), n in counts.items():
+        months[form_id, bucket_start(day, 'month')] += n
+
+    bind = db.session.get_bind()
+    db.session.execute(upsert_statement(bind, DownloadDay), [
+        {'form_id': form_id, 'day': day, 'count': n} for (form_id, day), n in counts.items()
+    ])
+    db.session.execute(upsert_statement(bind, DownloadMonth), [
+        {'form_id': form_id, 'month': month, 'count': n} for (form_id, month), n in months.items()
+    ])
+
+
+# ==================== WINDOWS ====================
+
+def _parse_day(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise AnalyticsError(f'{name} must be a date (YYYY-MM-DD)')
+
+
+def get_window(args):
+    """(start, end) days, inclusive, from ?start=&end= or ?days= (ending today)"""
+    end = _parse_day(args['end'], 'end') if args.get('end') else datetime.utcnow().date()
+    if args.get('start'):
+        start = _parse_day(args['start'], 'start')
+    else:
+        try:
+            days = int(args.get('days', DEFAULT_WINDOW_DAYS))
+        except ValueError:
+            raise AnalyticsError('days must be an integer')
+        if days < 1:
+            raise AnalyticsError('days must be at least 1')
+        start = end - timedelta(days=days - 1)
+
+    if start > end:
+        raise AnalyticsError('start must not be after end')
+    if (end - start).days + 1 > MAX_WINDOW_DAYS:
+        raise AnalyticsError(f'The window cannot be longer than {MAX_WINDOW_DAYS} days')
+    return start, end
+
+
+def get_period(args):
+    period = args.get('period', 'day')
+    if period not in PERIODS:
+        raise AnalyticsError(f"period must be one of: {', '.join(PERIODS)}")
+    return period
+
+
+# ==================== QUERIES ====================
+
+def bucket_start(day, period):
+    """First day of the day/week (Monday)/month containing `day`"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _buckets(start, end, period):
+    bucket = bucket_start(start, period)
+    while bucket <= end:
+        yield bucket
+        if period == 'month':
+            bucket = _next_month(bucket)
+        else:
+            bucket += timedelta(days=7 if period == 'week' else 1)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def window_counts(start, end):
+    """(form_id, count) rows that add up to each form's downloads between two days.
+
+    Months lying wholly inside the window come from download_months, the days
+    before the first and after the last of them from download_days; every part
+    is a range scan of a (month|day, form_id, count) covering index.
+    """
+    first_month = start if start.day == 1 else _next_month(start)
+    end_month = bucket_start(end + timedelta(days=1), 'month')  # exclusive
+    if first_month >= end_month:
+        return select(DownloadDay.form_id, DownloadDay.count).where(DownloadDay.day.between(start, end))
+
+    parts = [select(DownloadMonth.form_id, DownloadMonth.count).where(
+        DownloadMonth.month >= first_month, DownloadMonth.month < end_month
+    )]
+    if start < first_month:
+        parts.append(select(DownloadDay.form_id, DownloadDay.count).where(
+            DownloadDay.day >= start, DownloadDay.day < first_month
+        ))
+    if end_month <= end:
+        parts.append(select(DownloadDay.form_id, DownloadDay.count).where(
+            DownloadDay.day >= end_month, DownloadDay.day <= end
+        ))
+    return union_all(*parts)
+
+
+def total_downloads(start, end):
+    """Downloads of all forms between two days"""
+    counts = window_counts(start, end).subquery()
+    return select(func.coalesce(func.sum(counts.c.count), 0))
+
+
+def top_forms(start, end, limit):
+    """The `limit` most downloaded forms between two days, most downloaded first"""
+    counts = window_counts(start, end).subquery()
+    totals = select(
+        counts.c.form_id, func.sum(counts.c.count).label('downloads')
+    ).group_by(counts.c.form_id).order_by(
+        func.sum(counts.c.count).desc(), counts.c.form_id
+    ).limit(limit).subquery()
+
+    rows = db.session.execute(
+        select(totals.c.form_id, DownloadableForm.title, DownloadableForm.category, totals.c.downloads)
+        .join(DownloadableForm, DownloadableForm.id == totals.c.form_id)
+        .order_by(totals.c.downloads.desc(), totals.c.form_id)
+    )
+    return [
+        {'form_id': r.form_id, 'title': r.title, 'category': r.category, 'downloads': r.downloads}
+        for r in rows
+    ]
+
+
+def download_series(start, end, period, form_id=None):
+    """Downloads per day/week/month between two days, every bucket included.
+
+    Covers one form (read from the primary key) or all forms (summed per day
+    on the day index). Week and month buckets are labelled by their first
+    day, so the first and last ones can cover part of a week or month.
+    """
+    if form_id is None:
+        query = select(DownloadDay.day, func.sum(DownloadDay.count)).group_by(DownloadDay.day)
+    else:
+        query = select(DownloadDay.day, DownloadDay.count).where(DownloadDay.form_id == form_id)
+    rows = db.session.execute(query.where(DownloadDay.day.between(start, end)))
+
+    totals = dict.fromkeys(_buckets(start, end, period), 0)
+    for day, count in rows:
+        totals[bucket_start(day, period)] += count
+    return [{'period_start': bucket, 'downloads': n} for bucket, n in totals.items()]
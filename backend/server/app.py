@@ -1,36 +1,112 @@
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from models import db
+from database import init_database
+from counters import download_counter
+from passwords import password_hasher
+from ratelimit import rate_limiter
+from storage import uploads_cli, send_upload, UploadRequest
+from serialization import JSONProvider
+from compression import init_compression
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+app.json = JSONProvider(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///chuna_sacco.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///chuna_sacco.db').replace('postgres://', 'postgresql://', 1)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Database profile - pool settings apply to Postgres, pragmas to SQLite
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 32768))  # 32MB
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # 256MB
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # ms
+
 # JWT Configuration
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 3600  # 1 hour
+app.config['ADMIN_USER_CACHE_TTL'] = int(os.environ.get('ADMIN_USER_CACHE_TTL', 60))  # seconds
+app.config['DASHBOARD_CACHE_TTL'] = int(os.environ.get('DASHBOARD_CACHE_TTL', 30))  # seconds
+
+# Password hashing - runs on a bounded pool; stored hashes using other parameters are upgraded on login
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # or e.g. 'pbkdf2:sha256:600000'
+app.config['PASSWORD_SALT_LENGTH'] = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))  # waiting checks beyond this get 503
+app.config['PASSWORD_HASH_TIMEOUT'] = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))  # seconds
 
 # Upload settings
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'static', 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+app.config['UPLOAD_MAX_FILE_SIZE'] = int(os.environ.get('UPLOAD_MAX_FILE_SIZE', 16 * 1024 * 1024))
+app.config['UPLOAD_CACHE_MAX_AGE'] = 365 * 24 * 3600  # upload URLs never change content
+# '' (Flask streams files), 'x-sendfile' (Apache/lighttpd) or 'x-accel' (nginx)
+app.config['UPLOAD_OFFLOAD'] = os.environ.get('UPLOAD_OFFLOAD', '')
+app.config['UPLOAD_ACCEL_PREFIX'] = os.environ.get('UPLOAD_ACCEL_PREFIX', '/internal-uploads/')
+app.config['USE_X_SENDFILE'] = app.config['UPLOAD_OFFLOAD'] == 'x-sendfile'
+
+# Download counts are buffered in memory and written in batches
+app.config['DOWNLOAD_FLUSH_INTERVAL'] = int(os.environ.get('DOWNLOAD_FLUSH_INTERVAL', 5))  # seconds
+
+# Public response cache (invalidated on every commit touching a cached table)
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 300))  # seconds
+
+# Pre-encoded snapshots of the busiest pages, rebuilt in the background on change
+app.config['SNAPSHOT_FOLDER'] = os.environ.get('SNAPSHOT_FOLDER', os.path.join(app.instance_path, 'snapshots'))
+app.config['SNAPSHOT_MAX_AGE'] = int(os.environ.get('SNAPSHOT_MAX_AGE', 300))  # seconds; covers changes made elsewhere
+
+# Response compression (gzip, or brotli when installed)
+app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes
+app.config['COMPRESS_MIMETYPES'] = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+# Rate limits (token buckets), by endpoint or blueprint; an endpoint's own limits replace its blueprint's.
+# 'memory' keeps buckets per process; 'sqlite:///<path>' shares them between the workers of one host.
+# Limits per ip use request.remote_addr; PROXY_FIX_X_FOR is how many proxies in front of us append to
+# X-Forwarded-For (0 when clients connect directly, or they could pick their own address).
+app.config['PROXY_FIX_X_FOR'] = int(os.environ.get('PROXY_FIX_X_FOR', 1 if app.config['UPLOAD_OFFLOAD'] == 'x-accel' else 0))
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+app.config['RATELIMIT_STORAGE'] = os.environ.get('RATELIMIT_STORAGE', 'memory')
+app.config['RATELIMITS'] = {
+    'auth_api.login': ['10/minute per ip', '5/minute per identity'],  # identity = attempted username
+    'auth_api.change_password': ['5/minute per identity'],
+    'public_api.track_download': ['20/minute per ip'],
+    'public_api.download_file': ['60/minute per ip'],
+    'public_api': ['600/minute per ip'],
+    'admin_api': ['1200/minute per identity'],
+}
+
+if app.config['PROXY_FIX_X_FOR']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
 # Initialize extensions
-db.init_app(app)
+init_database(app)
 migrate = Migrate(app, db)
+download_counter.init_app(app)
+password_hasher.init_app(app)
+rate_limiter.init_app(app)
+init_compression(app)
 jwt = JWTManager(app)
+app.cli.add_command(uploads_cli)
 
 # Initialize CORS (allow React to make requests)
 CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:3000", "http://localhost:5173"],  # React dev servers
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization"]
     },
     r"/static/*": {
@@ -56,8 +132,7 @@ def missing_token_callback(error):
 def serve_uploaded_file(folder, filename):
     """Serve uploaded files from the uploads directory"""
     try:
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], folder)
-        return send_from_directory(file_path, filename)
+        return send_upload(f'{folder}/{filename}')
     except Exception as e:
         return {'error': 'File not found', 'message': str(e)}, 404
 
@@ -0,0 +1,98 @@
+"""Concurrent public reads during admin writes, per SQLite profile.
+
+Compares SQLite's defaults (rollback journal, synchronous=FULL, 2MB cache)
+with the profile app.py configures (WAL, synchronous=NORMAL, larger cache and
+mmap). Each profile runs in its own process against a fresh temporary
+database: READERS threads request /api/public/news?limit=20 (response cache
+off) while one thread commits admin-style writes, for DURATION seconds.
+
+    cd backend/server && python bench/db_concurrency.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READERS = 4
+DURATION = 5  # seconds
+
+PROFILES = {
+    'DELETE/FULL, default cache': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_CACHE_SIZE_KB': '2000',
+        'SQLITE_MMAP_SIZE': '0',
+    },
+    'WAL/NORMAL, app profile': {},
+}
+
+
+def run_profile():
+    sys.path.insert(0, SERVER_DIR)
+    from datetime import date
+    from app import app
+    from models import db, SliderImage, NewsUpdate
+
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([SliderImage(image_url='/s.jpg', title=f's{i}') for i in range(5)])
+        db.session.add_all([
+            NewsUpdate(title=f'n{i}', content='x' * 3000, publish_date=date(2025, 1, 1)) for i in range(300)
+        ])
+        db.session.commit()
+
+    stop = time.time() + DURATION
+    latencies, errors, writes = [], [0], [0]
+
+    def reader():
+        client = app.test_client()
+        while time.time() < stop:
+            start = time.perf_counter()
+            if client.get('/api/public/news?limit=20&fields=title,publish_date').status_code != 200:
+                errors[0] += 1
+            latencies.append(time.perf_counter() - start)
+
+    def writer():
+        with app.app_context():
+            while time.time() < stop:
+                for slider in SliderImage.query.all():
+                    slider.title = str(time.time())
+                db.session.add(NewsUpdate(title='w', content='y' * 3000))
+                db.session.commit()
+                writes[0] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)] + [threading.Thread(target=writer)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    ms = lambda q: latencies[int(len(latencies) * q)] * 1000
+    print(f'reads={len(latencies)} p50={statistics.median(latencies) * 1000:.1f}ms '
+          f'p95={ms(.95):.1f}ms p99={ms(.99):.1f}ms errors={errors[0]} writes={writes[0]}')
+
+
+def main():
+    for name, overrides in PROFILES.items():
+        tmp = tempfile.mkdtemp(prefix='chuna-bench-')
+        env = dict(os.environ, **overrides)
+        env.update({
+            'DATABASE_URL': 'sqlite:///' + os.path.join(tmp, 'bench.db'),
+            'SNAPSHOT_FOLDER': os.path.join(tmp, 'snapshots'),
+            'RATELIMIT_ENABLED': 'false',
+        })
+        result = subprocess.run(
+            [sys.executable, __file__, '--run'], env=env, cwd=SERVER_DIR,
+            capture_output=True, text=True, check=True
+        )
+        print(f'{name:28} {result.stdout.strip().splitlines()[-1]}')
+
+
+if __name__ == '__main__':
+    run_profile() if '--run' in sys.argv else main()
@@ -0,0 +1,186 @@
+from sqlalchemy import select, insert, update, delete
+from models import db, ProductFeature
+from collections import defaultdict
+from datetime import datetime
+
+
+class BulkError(ValueError):
+    """Raised for a malformed bulk request body (reported as 400)"""
+
+
+def _check_value(column, value):
+    if value is None:
+        if not column.nullable:
+            raise BulkError(f'{column.key} cannot be null')
+        return None
+    if isinstance(column.type, db.Boolean):
+        ok = isinstance(value, bool)
+    elif isinstance(column.type, db.Integer):
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        ok = isinstance(value, str)
+        if ok and getattr(column.type, 'length', None) and len(value) > column.type.length:
+            raise BulkError(f'{column.key} is longer than {column.type.length} characters')
+    if not ok:
+        raise BulkError(f'Invalid value for {column.key}')
+    return value
+
+
+def get_ids(data):
+    """Validate {"ids": [...]}: a non-empty list of distinct integer ids"""
+    ids = (data or {}).get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise BulkError('ids must be a non-empty list')
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise BulkError('ids must be integers')
+    if len(set(ids)) != len(ids):
+        raise BulkError('ids must not repeat')
+    return ids
+
+
+def missing_ids(model, ids):
+    """The ids that have no row, checked with one query"""
+    found = {row[0] for row in db.session.query(model.id).filter(model.id.in_(ids))}
+    return [i for i in ids if i not in found]
+
+
+def update_params(model, items, fields):
+    """Turn [{"id": 1, "field": value}, ...] into executemany parameter sets.
+
+    Only `fields` may be set. Items are grouped by the columns they set, since
+    each executemany needs one statement shape; returns the list of groups.
+    """
+    if not isinstance(items, list) or not items:
+        raise BulkError('items must be a non-empty list')
+
+    columns = model.__table__.columns
+    now = datetime.utcnow()
+    groups = {}
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            raise BulkError('Every item needs an integer id')
+        if item['id'] in seen:
+            raise BulkError('ids must not repeat')
+        seen.add(item['id'])
+        values = {k: v for k, v in item.items() if k != 'id'}
+        unknown = set(values) - set(fields)
+        if unknown:
+            raise BulkError(f"Fields not allowed in bulk updates: {', '.join(sorted(unknown))}")
+        if not values:
+            raise BulkError(f"Item {item['id']} has nothing to update")
+
+        params = {'id': item['id']}
+        for key, value in values.items():
+            params[key] = _check_value(columns[key], value)
+        if 'updated_at' in columns:
+            params['updated_at'] = now
+        groups.setdefault(tuple(sorted(params)), []).append(params)
+    return list(groups.values())
+
+
+def reorder_params(model, ids):
+    """display_order = position in `ids` for every listed row"""
+    now = datetime.utcnow()
+    params = [{'id': id, 'display_order': position} for position, id in enumerate(ids)]
+    if 'updated_at' in model.__table__.columns:
+        for p in params:
+            p['updated_at'] = now
+    return params
+
+
+def execute_updates(model, groups):
+    """One executemany UPDATE ... WHERE id = ? per parameter group"""
+    for params in groups:
+        db.session.execute(update(model), params)
+
+
+def delete_statements(model, ids, column=None):
+    """DELETE statements for the rows whose `column` (default: id) is in `ids`, children first.
+
+    Follows the relationships declared with cascade='all, delete-orphan', so
+    deleting departments or categories takes their staff or products (and the
+    products' features) with them, as deleting them one by one through the ORM
+    did, but with one statement per table.
+    """
+    column = model.id if column is None else column
+    statements = []
+    for relationship in model.__mapper__.relationships:
+        if not relationship.cascade.delete:
+            continue
+        child = relationship.mapper.class_
+        foreign_key = next(iter(relationship.remote_side))
+        parent_ids = ids if column is model.id else select(model.id).where(column.in_(ids))
+        statements.extend(delete_statements(child, parent_ids, foreign_key))
+    statements.append(delete(model).where(column.in_(ids)))
+    return statements
+
+
+def execute_deletes(model, ids):
+    """Run delete_statements() and return how many `model` rows were deleted"""
+    result = None
+    for statement in delete_statements(model, ids):
+        # Nothing is loaded in the session that would need synchronizing
+        result = db.session.execute(statement, execution_options={'synchronize_session': False})
+    return result.rowcount
+
+
+def sync_features(product_id, features):
+    """Make a product's features match `features`, writing only what changed.
+
+    Entries are feature texts, or {"id", "feature_text"} dicts; blank ones are
+    skipped and each entry's display_order is its index, as before. Existing
+    rows are matched by id first and then by text, and keep their ids: a
+    matched row is only updated if its text or position changed, unmatched
+    entries are inserted and unmatched rows deleted, one bulk statement each.
+    Returns (inserted, updated, deleted) counts.
+    """
+    if not isinstance(features, list):
+        raise BulkError('features must be a list')
+
+    existing = db.session.query(
+        ProductFeature.id, ProductFeature.feature_text, ProductFeature.display_order
+    ).filter_by(product_id=product_id).all()
+    by_id = {row.id: row for row in existing}
+    by_text = defaultdict(list)
+    for row in existing:
+        by_text[row.feature_text].append(row.id)
+
+    wanted = []
+    matched = set()
+    for position, entry in enumerate(features):
+        feature_id = None
+        if isinstance(entry, dict):
+            feature_id, entry = entry.get('id'), entry.get('feature_text')
+        if not isinstance(entry, str):
+            raise BulkError('Every feature needs a feature_text')
+        if not entry.strip():
+            continue
+        if feature_id in by_id and feature_id not in matched:
+            matched.add(feature_id)
+        else:
+            feature_id = None
+        wanted.append([position, entry, feature_id])
+
+    for item in wanted:
+        if item[2] is None:
+            item[2] = next((i for i in by_text.get(item[1], []) if i not in matched), None)
+            if item[2] is not None:
+                matched.add(item[2])
+
+    inserts, updates = [], []
+    for position, text, feature_id in wanted:
+        if feature_id is None:
+            inserts.append({'product_id': product_id, 'feature_text': text, 'display_order': position})
+        elif (by_id[feature_id].feature_text, by_id[feature_id].display_order) != (text, position):
+            updates.append({'id': feature_id, 'feature_text': text, 'display_order': position})
+    removed = [row.id for row in existing if row.id not in matched]
+
+    if removed:
+        db.session.execute(delete(ProductFeature).where(ProductFeature.id.in_(removed)),
+                           execution_options={'synchronize_session': False})
+    if updates:
+        db.session.execute(update(ProductFeature), updates)
+    if inserts:
+        db.session.execute(insert(ProductFeature), inserts)
+    return len(inserts), len(updates), len(removed)
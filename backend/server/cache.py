@@ -0,0 +1,268 @@
+from flask import request, current_app
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import db, TableVersion
+from compression import encoded_etag, response_encoding
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+import hashlib
+import threading
+import time
+
+# ==================== TABLE VERSIONS ====================
+# Every table gets a counter that is bumped whenever a committed transaction
+# touched one of its rows. Cached responses remember the counters they were
+# built against, so an entry is stale exactly when one of its tables changed.
+# These counters are per process; the same changes are also recorded in the
+# table_versions rows, in the writing transaction, for validators that every
+# worker agrees on.
+
+_versions = {}
+_versions_lock = threading.Lock()
+_change_listeners = []
+
+
+def get_versions(tables):
+    """Return the current version counters for the given table names"""
+    return tuple(_versions.get(t, 0) for t in tables)
+
+
+def bump_versions(tables):
+    """Invalidate everything cached against the given table names"""
+    with _versions_lock:
+        for t in tables:
+            _versions[t] = _versions.get(t, 0) + 1
+    for listener in _change_listeners:
+        listener(tables)
+
+
+def add_change_listener(fn):
+    """Call fn(tables) after every bump, e.g. to rebuild something derived from them"""
+    _change_listeners.append(fn)
+
+
+def touch_tables(tables):
+    """Record a change to `tables` that didn't go through their rows (e.g. new image variants)"""
+    _record_tables(db.session, tables)
+    db.session.commit()
+
+
+def _pending_tables(session):
+    return session.info.setdefault('changed_tables', set())
+
+
+def _version_upsert(bind):
+    """Add 1 to a table's table_versions row (creating it) and stamp the time"""
+    dialect = postgresql if bind.dialect.name == 'postgresql' else sqlite
+    table = TableVersion.__table__
+    stmt = dialect.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.table_name],
+        set_={'version': table.c.version + 1, 'updated_at': stmt.excluded['updated_at']}
+    )
+
+
+def _record_tables(session, tables):
+    """Add tables to the transaction's changes, bumping their stored versions once per transaction"""
+    pending = _pending_tables(session)
+    new = set(tables) - pending - {TableVersion.__tablename__}
+    if not new:
+        return
+    pending.update(new)
+    connection = session.connection()
+    now = datetime.utcnow()
+    connection.execute(_version_upsert(connection), [
+        {'table_name': name, 'version': 1, 'updated_at': now} for name in sorted(new)
+    ])
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flushed_tables(session, flush_context):
+    """Remember which tables the flushed rows belong to"""
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            tables.add(table)
+    _record_tables(session, tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_bulk_tables(orm_execute_state):
+    """Catch Query.update() / Query.delete() and Core DML, which bypass the flush"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        table = mapper.local_table if mapper is not None else getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _record_tables(orm_execute_state.session, [table.name])
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed_tables(session):
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        bump_versions(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_tables(session):
+    session.info.pop('changed_tables', None)
+
+
+# ==================== VERSIONED CACHE ====================
+
+class VersionedCache:
+    """Bounded LRU whose entries are only valid for the table versions they were stored with"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, versions, ttl=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_versions, stored_at, value = entry
+            if stored_versions != versions or (ttl and time.monotonic() - stored_at > ttl):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, versions, value):
+        with self._lock:
+            self._entries[key] = (versions, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Encoded JSON responses of the public endpoints
+response_cache = VersionedCache(max_entries=512)
+
+
+# ==================== CONDITIONAL REQUESTS ====================
+
+def compute_validators(key, tables):
+    """Return (etag, last_modified) for the current state of `tables`.
+
+    Both come from the tables' table_versions rows: one primary-key lookup per
+    table, however large the tables are, and the same answer in every worker
+    process and across restarts. Tables never written since the rows were
+    introduced have none, and count as version 0.
+    """
+    rows = db.session.execute(
+        select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.table_name.in_(tables))
+    ).all()
+    stored = {r.table_name: r for r in rows}
+    last_modified = max((r.updated_at for r in rows), default=None)
+    state = repr((key, [(name, stored[name].version if name in stored else 0) for name in tables]))
+    etag = hashlib.sha1(state.encode('utf-8')).hexdigest()
+    return etag, last_modified
+
+
+def _client_etag(etag):
+    """Which of our tags the client's If-None-Match holds: bare, or with an encoding suffix"""
+    for tag in (etag, encoded_etag(etag, 'gzip'), encoded_etag(etag, 'br')):
+        if request.if_none_match.contains(tag):
+            return tag
+    return None
+
+
+def _not_modified(etag, last_modified):
+    """Check If-None-Match (preferred) or If-Modified-Since against validators"""
+    if request.if_none_match:
+        return _client_etag(etag) is not None
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _with_validators(response, etag, last_modified):
+    if etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def _not_modified_response(etag, last_modified, entry=None):
+    """304 carrying the ETag a 200 would have, encoding suffix included.
+
+    With a cache entry its body says whether compression.py would encode it;
+    otherwise the tag the client matched names its representation, and a
+    match by date alone assumes a body large enough to be compressed.
+    """
+    if entry is not None:
+        encoding = response_encoding(current_app.config, entry['mimetype'], len(entry['body']))
+        tag = encoded_etag(etag, encoding) if encoding else etag
+    elif request.if_none_match:
+        tag = _client_etag(etag)
+    else:
+        encoding = response_encoding(current_app.config, 'application/json')
+        tag = encoded_etag(etag, encoding) if encoding else etag
+    return _with_validators(current_app.response_class(status=304), tag, last_modified)
+
+
+def _cache_key():
+    args = tuple(sorted(request.args.items(multi=True)))
+    view_args = tuple(sorted((request.view_args or {}).items()))
+    return (request.endpoint, view_args, args)
+
+
+def cached_response(*tables, cache=None):
+    """Cache a JSON view's encoded body until one of `tables` changes.
+
+    Responses carry a strong ETag and Last-Modified derived from `tables`,
+    and conditional requests are answered with 304 before the view runs.
+    Only successful responses are stored. Entries also expire after
+    RESPONSE_CACHE_TTL seconds so other worker processes, which keep their
+    own counters, eventually pick up changes made elsewhere. Views with
+    unbounded keys pass their own `cache`, so they can't evict everyone else's
+    entries from response_cache.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _cache_key()
+            store = cache or response_cache
+            caching = current_app.config.get('RESPONSE_CACHE_ENABLED', True)
+            versions = get_versions(tables)
+            ttl = current_app.config.get('RESPONSE_CACHE_TTL', 300)
+
+            entry = store.get(key, versions, ttl) if caching else None
+            if entry is None:
+                etag, last_modified = compute_validators(key, tables)
+                if _not_modified(etag, last_modified):
+                    return _not_modified_response(etag, last_modified)
+
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if not caching:
+                    return _with_validators(response, etag, last_modified)
+                entry = store.set(key, versions, {
+                    'body': response.get_data(),
+                    'mimetype': response.mimetype,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'compressed': {}  # encoding -> body, filled in by compression.py
+                })
+            elif _not_modified(entry['etag'], entry['last_modified']):
+                return _not_modified_response(entry['etag'], entry['last_modified'], entry)
+
+            response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+            response.compressed_variants = entry['compressed']
+            return _with_validators(response, entry['etag'], entry['last_modified'])
+        return wrapper
+    return decorator
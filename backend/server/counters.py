@@ -0,0 +1,100 @@
+from sqlalchemy import update, bindparam, func
+from models import db, DownloadableForm
+from analytics import record_days
+from collections import Counter
+from datetime import datetime
+import atexit
+import threading
+import time
+
+
+class DownloadCounter:
+    """Write-behind download counter.
+
+    Increments are accumulated in memory per form and day, and flushed every
+    DOWNLOAD_FLUSH_INTERVAL seconds in one transaction: an executemany
+    `UPDATE ... SET download_count = download_count + n` per form, and an
+    executemany upsert into the daily download_days rows. Bursts of clicks
+    therefore don't each take the SQLite write lock. Pending counts are
+    flushed on interpreter exit.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DOWNLOAD_FLUSH_INTERVAL', 5)  # seconds
+        app.extensions['download_counter'] = self
+        self.app = app
+        atexit.register(self.flush)
+
+    def increment(self, form_id, n=1):
+        """Record n downloads and return how many are still pending for the form"""
+        key = (form_id, datetime.utcnow().date())
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + n
+            pending = sum(n for key, n in self._pending.items() if key[0] == form_id)
+        self._ensure_flusher()
+        return pending
+
+    def pending(self, form_id):
+        with self._lock:
+            return sum(n for key, n in self._pending.items() if key[0] == form_id)
+
+    def flush(self):
+        """Write all pending increments in a single transaction"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch or self.app is None:
+            return 0
+
+        table = DownloadableForm.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('form_id'))
+            .values(download_count=func.coalesce(table.c.download_count, 0) + bindparam('n'))
+        )
+        per_form = Counter()
+        for (form_id, day), n in batch.items():
+            per_form[form_id] += n
+        params = [{'form_id': form_id, 'n': n} for form_id, n in per_form.items()]
+
+        with self.app.app_context():
+            try:
+                db.session.execute(stmt, params)
+                record_days(batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                # Put the counts back so the next flush retries them
+                with self._lock:
+                    for key, n in batch.items():
+                        self._pending[key] = self._pending.get(key, 0) + n
+                self.app.logger.error(f'Failed to flush download counts: {e}')
+                return 0
+            finally:
+                db.session.remove()
+        return sum(batch.values())
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='download-counter', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = self.app.config['DOWNLOAD_FLUSH_INTERVAL']
+        while True:
+            time.sleep(interval)
+            self.flush()
+
+
+download_counter = DownloadCounter()
@@ -0,0 +1,54 @@
+from sqlalchemy import event
+from models import db
+
+
+def is_sqlite(uri):
+    return uri.startswith('sqlite')
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+    if is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        # The driver-level timeout is how long a connection waits on a locked database
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000}}
+
+    return {
+        'pool_pre_ping': True,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE']
+    }
+
+
+def sqlite_pragmas(config):
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'cache_size': -config['SQLITE_CACHE_SIZE_KB'],  # negative means KiB, not pages
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT'],
+        'temp_store': 'MEMORY'
+    }
+
+
+def init_database(app):
+    """Initialize Flask-SQLAlchemy and apply per-connection SQLite pragmas.
+
+    WAL lets public readers keep reading while an admin write is in progress,
+    and synchronous=NORMAL is durable under WAL except on power loss.
+    """
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+
+    if not is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+
+    pragmas = sqlite_pragmas(app.config)
+    with app.app_context():
+        @event.listens_for(db.engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+            cursor.close()
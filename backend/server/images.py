@@ -0,0 +1,150 @@
+from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import time
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; uploads are then served as-is
+    Image = None
+
+# Folders whose uploads get resized variants (forms are documents, not images)
+IMAGE_FOLDERS = {'slider', 'news', 'staff', 'board', 'about', 'awards'}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tiff'}
+
+# Variant name -> longest side in pixels. Images are never upscaled.
+VARIANT_SIZES = {
+    'thumb': 320,
+    'medium': 800,
+    'full': 1600
+}
+
+# Tables whose cached responses embed the variants of each folder
+FOLDER_TABLES = {
+    'slider': 'slider_images',
+    'news': 'news_updates',
+    'staff': 'staff_members',
+    'board': 'board_members',
+    'about': 'about_content',
+    'awards': 'awards'
+}
+
+VARIANT_FORMAT = 'WEBP'
+VARIANT_QUALITY = 80
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-variants')
+_manifests = {}
+# url -> when to look for its manifest again. Builds in this process clear the
+# entry at once; the delay is how long other processes take to notice one.
+_missing = {}
+MISSING_RETRY = 60  # seconds
+
+
+def _variants_dir(folder_path):
+    return os.path.join(folder_path, 'variants')
+
+
+def _manifest_path(original_path):
+    folder_path, filename = os.path.split(original_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(_variants_dir(folder_path), f'{stem}.json')
+
+
+def wants_variants(folder, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return Image is not None and folder in IMAGE_FOLDERS and ext in IMAGE_EXTENSIONS
+
+
+def build_variants(original_path, url):
+    """Write the resized variants and a manifest describing them next to the original"""
+    folder_path, filename = os.path.split(original_path)
+    stem = os.path.splitext(filename)[0]
+    url_prefix = url.rsplit('/', 1)[0]
+    os.makedirs(_variants_dir(folder_path), exist_ok=True)
+
+    variants = []
+    with Image.open(original_path) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        for name, size in VARIANT_SIZES.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            variant_name = f'{stem}.{name}.webp'
+            variant.save(os.path.join(_variants_dir(folder_path), variant_name),
+                         VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+            variants.append({
+                'name': name,
+                'url': f'{url_prefix}/variants/{variant_name}',
+                'width': variant.width,
+                'height': variant.height
+            })
+
+    # Write the manifest last, and atomically, so readers never see a partial set
+    manifest_path = _manifest_path(original_path)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(variants, f)
+    os.replace(tmp_path, manifest_path)
+    _missing.pop(url, None)
+    return variants
+
+
+def has_variants(original_path):
+    return os.path.exists(_manifest_path(original_path))
+
+
+def process_image_async(original_path, url, folder):
+    """Queue variant generation so the upload request returns immediately"""
+    # Imported here because cache imports models, which import this module
+    from cache import touch_tables
+    app = current_app._get_current_object()
+
+    # Deduplicated uploads already have their variants
+    if has_variants(original_path):
+        return None
+
+    def run():
+        try:
+            build_variants(original_path, url)
+        except Exception as e:
+            app.logger.error(f'Failed to build image variants for {original_path}: {e}')
+            return
+        # Responses cached (by us or by clients) before the variants existed are now incomplete
+        with app.app_context():
+            touch_tables([FOLDER_TABLES[folder]])
+
+    return _executor.submit(run)
+
+
+def image_variants(url):
+    """srcset-friendly list of [{name, url, width, height}] for an uploaded image.
+
+    Empty until the variants have been generated (or for external URLs).
+    """
+    if not url or not url.startswith('/static/uploads/'):
+        return []
+    if url in _manifests:
+        return _manifests[url]
+    now = time.monotonic()
+    if _missing.get(url, 0) > now:
+        return []
+
+    relative_path = url[len('/static/uploads/'):]
+    original_path = os.path.join(current_app.config['UPLOAD_FOLDER'], *relative_path.split('/'))
+    try:
+        with open(_manifest_path(original_path)) as f:
+            variants = json.load(f)
+    except (OSError, ValueError):
+        # Most uploads have no variants (documents, uploads from before them), so remember that
+        if len(_missing) > 4096:
+            _missing.clear()
+        _missing[url] = now + MISSING_RETRY
+        return []
+
+    # Only finished manifests are memoised; they never change once written
+    if len(_manifests) > 4096:
+        _manifests.clear()
+    _manifests[url] = variants
+    return variants
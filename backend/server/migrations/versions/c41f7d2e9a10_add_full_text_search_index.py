@@ -0,0 +1,171 @@
+"""add full-text search index
+
+Revision ID: c41f7d2e9a10
+Revises: a6bb9e49c3b3
+Create Date: 2026-10-17 23:41:12.304117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7d2e9a10'
+down_revision = 'a6bb9e49c3b3'
+branch_labels = None
+depends_on = None
+
+# The index as search.py defined it at this revision; later changes to
+# search.py need migrations of their own.
+
+_PRODUCT_DOC = """
+    SELECT p.id * 8 + 3, 'product', p.id, p.name,
+           coalesce(p.description, '') || ' ' ||
+           coalesce((SELECT group_concat(f.feature_text, ' ') FROM product_features f
+                     WHERE f.product_id = p.id), '')
+    FROM products p WHERE p.id = {id} AND p.is_active = 1
+"""
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        doc_type UNINDEXED, doc_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+
+    # News
+    """CREATE TRIGGER IF NOT EXISTS search_news_ai AFTER INSERT ON news_updates BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 1, 'news', NEW.id, NEW.title,
+                coalesce(NEW.excerpt, '') || ' ' || coalesce(NEW.content, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_news_au AFTER UPDATE ON news_updates BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 1;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 1, 'news', NEW.id, NEW.title,
+                coalesce(NEW.excerpt, '') || ' ' || coalesce(NEW.content, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_news_ad AFTER DELETE ON news_updates BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 1;
+    END""",
+
+    # Downloadable forms
+    """CREATE TRIGGER IF NOT EXISTS search_forms_ai AFTER INSERT ON downloadable_forms
+    WHEN NEW.is_active = 1 BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 2, 'form', NEW.id, NEW.title, coalesce(NEW.category, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_forms_au AFTER UPDATE OF title, category, is_active
+    ON downloadable_forms BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 2;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        SELECT NEW.id * 8 + 2, 'form', NEW.id, NEW.title, coalesce(NEW.category, '')
+        WHERE NEW.is_active = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_forms_ad AFTER DELETE ON downloadable_forms BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 2;
+    END""",
+
+    # Products, with their features folded into the body
+    f"""CREATE TRIGGER IF NOT EXISTS search_products_ai AFTER INSERT ON products BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_products_au AFTER UPDATE ON products BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 3;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.id')};
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_products_ad AFTER DELETE ON products BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 3;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_features_ai AFTER INSERT ON product_features BEGIN
+        DELETE FROM search_index WHERE rowid = NEW.product_id * 8 + 3;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.product_id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_features_au AFTER UPDATE ON product_features BEGIN
+        DELETE FROM search_index WHERE rowid IN (OLD.product_id * 8 + 3, NEW.product_id * 8 + 3);
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='OLD.product_id')};
+        INSERT OR REPLACE INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.product_id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_features_ad AFTER DELETE ON product_features BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.product_id * 8 + 3;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='OLD.product_id')};
+    END""",
+
+    # Staff
+    """CREATE TRIGGER IF NOT EXISTS search_staff_ai AFTER INSERT ON staff_members
+    WHEN NEW.is_active = 1 BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 4, 'staff', NEW.id, NEW.full_name, coalesce(NEW.position, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_staff_au AFTER UPDATE OF full_name, position, is_active
+    ON staff_members BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 4;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        SELECT NEW.id * 8 + 4, 'staff', NEW.id, NEW.full_name, coalesce(NEW.position, '')
+        WHERE NEW.is_active = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_staff_ad AFTER DELETE ON staff_members BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 4;
+    END"""
+]
+
+# Rebuilds the whole index from the source tables (idempotent)
+SQLITE_BACKFILL = [
+    "DELETE FROM search_index",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT id * 8 + 1, 'news', id, title, coalesce(excerpt, '') || ' ' || coalesce(content, '')
+       FROM news_updates""",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT id * 8 + 2, 'form', id, title, coalesce(category, '')
+       FROM downloadable_forms WHERE is_active = 1""",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT p.id * 8 + 3, 'product', p.id, p.name,
+              coalesce(p.description, '') || ' ' ||
+              coalesce((SELECT group_concat(f.feature_text, ' ') FROM product_features f
+                        WHERE f.product_id = p.id), '')
+       FROM products p WHERE p.is_active = 1""",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT id * 8 + 4, 'staff', id, full_name, coalesce(position, '')
+       FROM staff_members WHERE is_active = 1"""
+]
+
+# Postgres: table -> the tsvector document search.py queries
+PG_DOCUMENTS = {
+    'news_updates': "coalesce(title, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(content, '')",
+    'downloadable_forms': "coalesce(title, '') || ' ' || coalesce(category, '')",
+    'products': "coalesce(name, '') || ' ' || coalesce(description, '')",
+    'staff_members': "coalesce(full_name, '') || ' ' || coalesce(position, '')"
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # FTS5 table kept in sync by triggers, then filled from existing rows
+        for statement in SQLITE_DDL + SQLITE_BACKFILL:
+            op.execute(statement)
+        return
+
+    # Postgres: GIN indexes on the same tsvector expressions search.py queries
+    for table, document in PG_DOCUMENTS.items():
+        op.execute(f"CREATE INDEX ix_{table}_fts ON {table} USING gin (to_tsvector('english', {document}))")
+    op.execute("CREATE INDEX ix_product_features_fts ON product_features USING gin (to_tsvector('english', feature_text))")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('news', 'forms', 'products', 'features', 'staff'):
+            for suffix in ('ai', 'au', 'ad'):
+                op.execute(f'DROP TRIGGER IF EXISTS search_{trigger}_{suffix}')
+        op.execute('DROP TABLE IF EXISTS search_index')
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_product_features_fts')
+    for table in PG_DOCUMENTS:
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_fts')
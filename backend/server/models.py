@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, select, func
 from datetime import datetime, date
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import password_hasher
+from images import image_variants
+from serialization import Schema
 
 db = SQLAlchemy(metadata=MetaData())
 
@@ -20,24 +22,23 @@ class AdminUser(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Hashing runs on the bounded password_hasher pool and can raise PasswordHasherBusy
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+    
+    schema = Schema(
+        'id', 'username', 'email', 'full_name', 'role', 'last_login',
+        'is_active', 'created_at', 'updated_at'
+    )
     
     def to_dict(self, include_sensitive=False):
-        data = {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'full_name': self.full_name,
-            'role': self.role,
-            'last_login': self.last_login.isoformat() if self.last_login else None,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        data = self.schema.dump(self)
         if include_sensitive:
             data['password_hash'] = self.password_hash
         return data
@@ -50,6 +51,9 @@ class AdminUser(db.Model):
 
 class SliderImage(db.Model):
     __tablename__ = 'slider_images'
+    __table_args__ = (
+        db.Index('ix_slider_images_is_active_display_order', 'is_active', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     image_url = db.Column(db.String(500), nullable=False)
@@ -61,18 +65,14 @@ class SliderImage(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    schema = Schema(
+        'id', 'image_url', ('image_variants', 'image_url', image_variants),
+        'title', 'subtitle', 'link_url', 'display_order', 'is_active',
+        'created_at', 'updated_at'
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'image_url': self.image_url,
-            'title': self.title,
-            'subtitle': self.subtitle,
-            'link_url': self.link_url,
-            'display_order': self.display_order,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return self.schema.dump(self)
     
     def __repr__(self):
         return f'<SliderImage {self.title}>'
@@ -80,6 +80,11 @@ class SliderImage(db.Model):
     
 class NewsUpdate(db.Model):
     __tablename__ = 'news_updates'
+    __table_args__ = (
+        db.Index('ix_news_updates_publish_date_id', 'publish_date', 'id'),
+        db.Index('ix_news_updates_category_publish_date', 'category', 'publish_date'),
+        db.Index('ix_news_updates_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300), nullable=False)
@@ -93,19 +98,15 @@ class NewsUpdate(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # List responses leave out content; to_dict adds it by default
+    schema = Schema(
+        'id', 'title', 'category', 'featured_image',
+        ('featured_image_variants', 'featured_image', image_variants),
+        'excerpt', 'author', 'publish_date', 'is_featured', 'created_at', 'updated_at'
+    )
+    
     def to_dict(self, include_content=True):
-        data = {
-            'id': self.id,
-            'title': self.title,
-            'category': self.category,
-            'featured_image': self.featured_image,
-            'excerpt': self.excerpt,
-            'author': self.author,
-            'publish_date': self.publish_date.isoformat() if self.publish_date else None,
-            'is_featured': self.is_featured,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        data = self.schema.dump(self)
         if include_content:
             data['content'] = self.content
         return data
@@ -128,17 +129,14 @@ class AboutContent(db.Model):
     display_order = db.Column(db.Integer, default=0)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    schema = Schema(
+        'id', 'section_key', 'title', 'content', 'image_url',
+        ('image_variants', 'image_url', image_variants),
+        'video_url', 'display_order', 'updated_at'
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'section_key': self.section_key,
-            'title': self.title,
-            'content': self.content,
-            'image_url': self.image_url,
-            'video_url': self.video_url,
-            'display_order': self.display_order,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return self.schema.dump(self)
     
     def __repr__(self):
         return f'<AboutContent {self.section_key}>'
@@ -153,14 +151,10 @@ class CoreValue(db.Model):
     icon_class = db.Column(db.String(100))
     display_order = db.Column(db.Integer, default=0)
     
+    schema = Schema('id', 'title', 'description', 'icon_class', 'display_order')
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'icon_class': self.icon_class,
-            'display_order': self.display_order
-        }
+        return self.schema.dump(self)
     
     def __repr__(self):
         return f'<CoreValue {self.title}>'
@@ -176,15 +170,13 @@ class Award(db.Model):
     icon_url = db.Column(db.String(500))
     display_order = db.Column(db.Integer, default=0)
     
+    schema = Schema(
+        'id', 'title', 'year', 'description', 'icon_url',
+        ('icon_variants', 'icon_url', image_variants), 'display_order'
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'year': self.year,
-            'description': self.description,
-            'icon_url': self.icon_url,
-            'display_order': self.display_order
-        }
+        return self.schema.dump(self)
     
     def __repr__(self):
         return f'<Award {self.title}>'
@@ -194,6 +186,9 @@ class Award(db.Model):
 
 class Department(db.Model):
     __tablename__ = 'departments'
+    __table_args__ = (
+        db.Index('ix_departments_is_active_display_order', 'is_active', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, unique=True)
@@ -208,20 +203,13 @@ class Department(db.Model):
     
     staff_members = db.relationship('StaffMember', backref='department', lazy=True, cascade='all, delete-orphan')
     
+    schema = Schema(
+        'id', 'name', 'slug', 'description', 'key_responsibilities', 'icon_class',
+        'display_order', 'is_active', 'created_at', 'updated_at', 'staff_count'
+    )
+    
     def to_dict(self, include_staff=False):
-        data = {
-            'id': self.id,
-            'name': self.name,
-            'slug': self.slug,
-            'description': self.description,
-            'key_responsibilities': self.key_responsibilities,
-            'icon_class': self.icon_class,
-            'display_order': self.display_order,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'staff_count': len(self.staff_members)
-        }
+        data = self.schema.dump(self)
         if include_staff:
             data['staff_members'] = [staff.to_dict() for staff in self.staff_members]
         return data
@@ -232,6 +220,9 @@ class Department(db.Model):
     
 class StaffMember(db.Model):
     __tablename__ = 'staff_members'
+    __table_args__ = (
+        db.Index('ix_staff_members_department_id_is_active_display_order', 'department_id', 'is_active', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
@@ -247,22 +238,15 @@ class StaffMember(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    schema = Schema(
+        'id', 'department_id', 'full_name', 'position', 'photo_url',
+        ('photo_variants', 'photo_url', image_variants),
+        'email', 'phone', 'education', 'bio', 'display_order', 'is_active',
+        'created_at', 'updated_at'
+    )
+    
     def to_dict(self, include_department=False):
-        data = {
-            'id': self.id,
-            'department_id': self.department_id,
-            'full_name': self.full_name,
-            'position': self.position,
-            'photo_url': self.photo_url,
-            'email': self.email,
-            'phone': self.phone,
-            'education': self.education,
-            'bio': self.bio,
-            'display_order': self.display_order,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        data = self.schema.dump(self)
         if include_department and self.department:
             data['department'] = {
                 'id': self.department.id,
@@ -277,6 +261,9 @@ class StaffMember(db.Model):
 
 class BoardMember(db.Model):
     __tablename__ = 'board_members'
+    __table_args__ = (
+        db.Index('ix_board_members_category_is_active_display_order', 'category', 'is_active', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(200), nullable=False)
@@ -292,22 +279,15 @@ class BoardMember(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    schema = Schema(
+        'id', 'full_name', 'position', 'category', 'photo_url',
+        ('photo_variants', 'photo_url', image_variants),
+        'email', 'phone', 'education', 'bio', 'display_order', 'is_active',
+        'created_at', 'updated_at'
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'full_name': self.full_name,
-            'position': self.position,
-            'category': self.category,
-            'photo_url': self.photo_url,
-            'email': self.email,
-            'phone': self.phone,
-            'education': self.education,
-            'bio': self.bio,
-            'display_order': self.display_order,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return self.schema.dump(self)
     
     def __repr__(self):
         return f'<BoardMember {self.full_name}>'
@@ -326,15 +306,10 @@ class ProductCategory(db.Model):
     
     products = db.relationship('Product', backref='category', lazy=True, cascade='all, delete-orphan')
     
+    schema = Schema('id', 'name', 'slug', 'description', 'display_order', 'product_count')
+    
     def to_dict(self, include_products=False):
-        data = {
-            'id': self.id,
-            'name': self.name,
-            'slug': self.slug,
-            'description': self.description,
-            'display_order': self.display_order,
-            'product_count': len(self.products)
-        }
+        data = self.schema.dump(self)
         if include_products:
             data['products'] = [product.to_dict() for product in self.products]
         return data
@@ -345,6 +320,11 @@ class ProductCategory(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_is_active_display_order', 'is_active', 'display_order'),
+        db.Index('ix_products_product_category_id_is_active_display_order', 'product_category_id', 'is_active', 'display_order'),
+        db.Index('ix_products_is_popular_is_active', 'is_popular', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_category_id = db.Column(db.Integer, db.ForeignKey('product_categories.id'), nullable=False)
@@ -361,27 +341,19 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    features = db.relationship('ProductFeature', backref='product', lazy=True, cascade='all, delete-orphan')
+    features = db.relationship('ProductFeature', backref='product', lazy=True, cascade='all, delete-orphan',
+                               order_by='(ProductFeature.display_order, ProductFeature.id)')
+    
+    schema = Schema(
+        'id', 'product_category_id', 'name', 'slug', 'max_amount', 'description',
+        'repayment_period', 'interest_rate', 'icon_class', 'is_popular',
+        'display_order', 'is_active', 'created_at', 'updated_at'
+    )
     
     def to_dict(self, include_features=True, include_category=False):
-        data = {
-            'id': self.id,
-            'product_category_id': self.product_category_id,
-            'name': self.name,
-            'slug': self.slug,
-            'max_amount': self.max_amount,
-            'description': self.description,
-            'repayment_period': self.repayment_period,
-            'interest_rate': self.interest_rate,
-            'icon_class': self.icon_class,
-            'is_popular': self.is_popular,
-            'display_order': self.display_order,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        data = self.schema.dump(self)
         if include_features:
-            data['features'] = [feature.to_dict() for feature in self.features]
+            data['features'] = ProductFeature.schema.dump_many(self.features)
         if include_category and self.category:
             data['category'] = {
                 'id': self.category.id,
@@ -396,19 +368,19 @@ class Product(db.Model):
 
 class ProductFeature(db.Model):
     __tablename__ = 'product_features'
+    __table_args__ = (
+        db.Index('ix_product_features_product_id_display_order', 'product_id', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     feature_text = db.Column(db.String(500), nullable=False)
     display_order = db.Column(db.Integer, default=0)
     
+    schema = Schema('id', 'product_id', 'feature_text', 'display_order')
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'product_id': self.product_id,
-            'feature_text': self.feature_text,
-            'display_order': self.display_order
-        }
+        return self.schema.dump(self)
     
     def __repr__(self):
         return f'<ProductFeature {self.feature_text[:30]}>'
@@ -418,6 +390,12 @@ class ProductFeature(db.Model):
 
 class DownloadableForm(db.Model):
     __tablename__ = 'downloadable_forms'
+    __table_args__ = (
+        db.Index('ix_downloadable_forms_is_active_upload_date_id', 'is_active', 'upload_date', 'id'),
+        db.Index('ix_downloadable_forms_category_is_active', 'category', 'is_active'),
+        db.Index('ix_downloadable_forms_created_at', 'created_at'),
+        db.Index('ix_downloadable_forms_download_count', 'download_count'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(300), nullable=False)
@@ -431,20 +409,91 @@ class DownloadableForm(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    daily_downloads = db.relationship('DownloadDay', lazy=True, cascade='all, delete-orphan')
+    monthly_downloads = db.relationship('DownloadMonth', lazy=True, cascade='all, delete-orphan')
+    
+    schema = Schema(
+        'id', 'title', 'category', 'file_url', 'file_size', 'file_type',
+        'download_count', 'upload_date', 'is_active', 'created_at', 'updated_at'
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'category': self.category,
-            'file_url': self.file_url,
-            'file_size': self.file_size,
-            'file_type': self.file_type,
-            'download_count': self.download_count,
-            'upload_date': self.upload_date.isoformat() if self.upload_date else None,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return self.schema.dump(self)
+    
+    def __repr__(self):
+        return f'<DownloadableForm {self.title}>'
+
+
+class DownloadDay(db.Model):
+    """Downloads of one form on one (UTC) day.
+
+    Download tracking adds to these rows in batches, so a form gets at most one
+    row per day however many times it is downloaded. The primary key serves
+    per-form time series; the (day, form_id, count) index covers totals and
+    top-N rankings over a range of days.
+    """
+    __tablename__ = 'download_days'
+    __table_args__ = (
+        db.Index('ix_download_days_day_form_id_count', 'day', 'form_id', 'count'),
+    )
+    
+    form_id = db.Column(db.Integer, db.ForeignKey('downloadable_forms.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DownloadDay {self.form_id} {self.day}: {self.count}>'
+
+
+class DownloadMonth(db.Model):
+    """Monthly rollup of DownloadDay, kept up to date by the same batched writes.
+
+    Long windows read whole months from here, so ranking forms over a year
+    scans 12 rows per form instead of 365.
+    """
+    __tablename__ = 'download_months'
+    __table_args__ = (
+        db.Index('ix_download_months_month_form_id_count', 'month', 'form_id', 'count'),
+    )
+    
+    form_id = db.Column(db.Integer, db.ForeignKey('downloadable_forms.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DownloadMonth {self.form_id} {self.month:%Y-%m}: {self.count}>'
+
+
+
+class TableVersion(db.Model):
+    """Change counter of one table, bumped in every transaction that writes to it.
+
+    HTTP validators are derived from these rows (see cache.py), which every
+    worker process shares, instead of scanning the tables themselves.
+    """
+    __tablename__ = 'table_versions'
+    
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<DownloadableForm {self.title}>'
\ No newline at end of file
+        return f'<TableVersion {self.table_name} {self.version}>'
+
+
+# Aggregate counts loaded as correlated subqueries, so serializing a list of
+# departments or categories doesn't load every child row just to count it
+
+Department.staff_count = db.column_property(
+    select(func.count(StaffMember.id))
+    .where(StaffMember.department_id == Department.id)
+    .correlate_except(StaffMember)
+    .scalar_subquery()
+)
+
+ProductCategory.product_count = db.column_property(
+    select(func.count(Product.id))
+    .where(Product.product_category_id == ProductCategory.id)
+    .correlate_except(Product)
+    .scalar_subquery()
+)
\ No newline at end of file
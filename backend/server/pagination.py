@@ -0,0 +1,123 @@
+from flask import request, current_app
+from sqlalchemy import and_, or_
+from datetime import date, datetime
+import base64
+import json
+
+
+class PaginationError(ValueError):
+    """Raised for a malformed limit, cursor or fields parameter"""
+
+
+# ==================== KEYSET PAGINATION ====================
+
+def page_requested():
+    """Paging is opt-in so existing clients keep getting full lists"""
+    return 'limit' in request.args or 'cursor' in request.args
+
+
+def get_limit():
+    default = current_app.config.get('PAGE_LIMIT_DEFAULT', 20)
+    maximum = current_app.config.get('PAGE_LIMIT_MAX', 100)
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, maximum)
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort_value, id_value):
+    raw = json.dumps([_encode_value(sort_value), id_value]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_column):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, id_value = json.loads(raw)
+        return _decode_value(sort_column, sort_value), int(id_value)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+
+def _after(sort_column, id_column, sort_value, id_value, descending):
+    """Rows strictly after (sort_value, id_value) in (sort, id) order, NULLs last"""
+    if descending:
+        past_sort, past_id = sort_column < sort_value, id_column < id_value
+    else:
+        past_sort, past_id = sort_column > sort_value, id_column > id_value
+
+    if sort_value is None:
+        return and_(sort_column.is_(None), past_id)
+    return or_(
+        past_sort,
+        and_(sort_column == sort_value, past_id),
+        sort_column.is_(None)
+    )
+
+
+def paginate(query, sort_column, id_column, descending=True):
+    """Apply keyset ordering to `query` and return (items, next_cursor)"""
+    limit = get_limit()
+
+    if descending:
+        query = query.order_by(sort_column.desc().nulls_last(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc().nulls_last(), id_column.asc())
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor, sort_column)
+        query = query.filter(_after(sort_column, id_column, sort_value, id_value, descending))
+
+    items = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return items, next_cursor
+
+
+# ==================== FIELD SELECTION ====================
+
+def model_fields(model, *extra):
+    """Names accepted by ?fields= for a model: its columns plus any extras"""
+    return [c.key for c in model.__table__.columns] + list(extra)
+
+
+def get_fields(allowed):
+    """Parse ?fields=a,b,c into a set, or None when every field is wanted"""
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    fields = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields | {'id'}
+
+
+def prune(data, fields):
+    if fields is None:
+        return data
+    return {k: v for k, v in data.items() if k in fields}
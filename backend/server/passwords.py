@@ -0,0 +1,89 @@
+from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import threading
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a hash took too long (reported as 503)"""
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    Hashes are deliberately slow (scrypt takes ~50 ms of CPU), so a burst of
+    login attempts hashed on the request threads would occupy all of them and
+    every core. Here at most PASSWORD_HASH_WORKERS hashes run at once, at most
+    PASSWORD_HASH_QUEUE more wait, and anything beyond that is refused at once
+    with PasswordHasherBusy instead of queueing; so is a caller that waited
+    PASSWORD_HASH_TIMEOUT seconds. hashlib releases the GIL while hashing, so
+    the other request threads keep serving meanwhile.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._workers = None
+        self._slots = None
+        self._method_prefix = None  # (configured method, prefix werkzeug writes for it)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_QUEUE', 8)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 5)  # seconds
+        app.extensions['password_hasher'] = self
+        self.app = app
+
+        # Calling init_app again (another app, or new settings) keeps a pool of the same size
+        workers = app.config['PASSWORD_HASH_WORKERS']
+        if self._workers != workers:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)  # hashes already running still finish
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            self._workers = workers
+        self._slots = threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE'])
+
+    @property
+    def method(self):
+        return self.app.config['PASSWORD_HASH_METHOD']
+
+    @property
+    def salt_length(self):
+        return self.app.config['PASSWORD_SALT_LENGTH']
+
+    def _run(self, fn, *args):
+        slots = self._slots  # released to the semaphore it came from, even after an init_app
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Too many password checks in progress')
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        # The slot is held until the hash finishes, even if the caller gave up on it
+        future.add_done_callback(lambda f: slots.release())
+        try:
+            return future.result(timeout=self.app.config['PASSWORD_HASH_TIMEOUT'])
+        except TimeoutError:
+            raise PasswordHasherBusy('Password check timed out')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether a stored hash was made with other parameters than the configured ones"""
+        if self._method_prefix is None or self._method_prefix[0] != self.method:
+            # werkzeug spells out default parameters ('scrypt' -> 'scrypt:32768:8:1')
+            self._method_prefix = (self.method, self.hash('').split('$', 1)[0])
+        method, _, rest = pwhash.partition('$')
+        salt = rest.partition('$')[0]
+        return method != self._method_prefix[1] or len(salt) != self.salt_length
+
+
+password_hasher = PasswordHasher()
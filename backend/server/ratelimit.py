@@ -0,0 +1,235 @@
+from flask import request, jsonify
+from flask_jwt_extended import decode_token
+from collections import OrderedDict
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Token buckets: a limit of "10/minute" holds up to 10 tokens, refilled at 10
+# per minute, and every request takes one. Limits are configured in
+# RATELIMITS, keyed by endpoint ('auth_api.login') or blueprint ('public_api');
+# an endpoint's own limits replace those of its blueprint.
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+LIMIT_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?(?:\s+per\s+(ip|identity))?\s*$')
+
+
+class Limit:
+    """A parsed '<count>/[<n>]<period> [per ip|identity]' rule (per ip by default)"""
+
+    def __init__(self, spec):
+        match = LIMIT_RE.match(spec)
+        if not match:
+            raise ValueError(f'Invalid rate limit: {spec!r}')
+        count, n, period, key = match.groups()
+        self.spec = spec.strip()
+        self.capacity = int(count)
+        self.rate = self.capacity / (int(n or 1) * PERIODS[period])  # tokens per second
+        self.key = key or 'ip'
+
+
+def consume(tokens, updated, now, capacity, rate):
+    """Refill a bucket and take one token: (allowed, tokens left, seconds until one is available)"""
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0
+    return False, tokens, (1 - tokens) / rate
+
+
+def consume_all(states, now, buckets):
+    """Take one token from every bucket, or from none if any is empty.
+
+    `states` are the stored (tokens, updated) of `buckets` ((key, capacity,
+    rate) tuples), None for buckets not stored yet. Returns (allowed, seconds
+    until all have a token, tokens left per bucket).
+    """
+    results = [
+        consume(*(state or (capacity, now)), now, capacity, rate)
+        for state, (key, capacity, rate) in zip(states, buckets)
+    ]
+    allowed = all(r[0] for r in results)
+    return allowed, max(r[2] for r in results), [r[1] for r in results]
+
+
+# ==================== STORAGE ====================
+
+class MemoryStorage:
+    """Buckets of this process, as key -> [tokens, updated, full_at] lists.
+
+    When max_keys are held, buckets that have refilled completely by now (and
+    so are the same as no bucket) are dropped, or else the oldest half.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, buckets):
+        now = time.monotonic()
+        with self._lock:
+            states = [self._buckets.get(key) for key, capacity, rate in buckets]
+            allowed, retry_after, tokens = consume_all(
+                [state and state[:2] for state in states], now, buckets
+            )
+            new_keys = sum(state is None for state in states)
+            if allowed:
+                if new_keys and len(self._buckets) + new_keys > self.max_keys:
+                    self._prune(now)
+                for (key, capacity, rate), left in zip(buckets, tokens):
+                    self._buckets[key] = [left, now, now + (capacity - left) / rate]
+        return allowed, retry_after
+
+    def _prune(self, now):
+        full = [k for k, bucket in self._buckets.items() if bucket[2] <= now]
+        for k in full or list(self._buckets)[:len(self._buckets) // 2]:
+            del self._buckets[k]
+
+
+class SQLiteStorage:
+    """Buckets in a SQLite file shared by every worker process on the host.
+
+    Each hit is one short write transaction; the file is not meant to survive
+    a crash, so it is written without fsync.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID'
+            )
+            self._local.conn = conn
+        return conn
+
+    def hit(self, buckets):
+        now = time.time()  # shared between processes, so wall-clock time
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            states = [
+                conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                for key, capacity, rate in buckets
+            ]
+            allowed, retry_after, tokens = consume_all(states, now, buckets)
+            if allowed:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                    [(key, left, now) for (key, capacity, rate), left in zip(buckets, tokens)]
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+# ==================== LIMITER ====================
+
+# Verified subject per bearer token, so limiting by identity doesn't decode
+# every token twice (the view still fully verifies it, expiry included)
+_token_identities = OrderedDict()
+_token_identities_lock = threading.Lock()
+TOKEN_IDENTITIES_MAX = 1024
+
+
+def _token_identity(token):
+    with _token_identities_lock:
+        if token in _token_identities:
+            _token_identities.move_to_end(token)
+            return _token_identities[token]
+    try:
+        identity = str(decode_token(token)['sub'])
+    except Exception:
+        return None  # not cached: invalid tokens are rejected by the view anyway
+    with _token_identities_lock:
+        _token_identities[token] = identity
+        while len(_token_identities) > TOKEN_IDENTITIES_MAX:
+            _token_identities.popitem(last=False)
+    return identity
+
+
+def _identity():
+    """Who the request acts as: the JWT subject, or the username a login attempts"""
+    if request.endpoint == 'auth_api.login':
+        username = (request.get_json(silent=True) or {}).get('username')
+        return str(username).strip().lower() if username else None
+    authorization = request.headers.get('Authorization', '')
+    if not authorization.startswith('Bearer '):
+        return None
+    return _token_identity(authorization[len('Bearer '):])
+
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.storage = None
+        self._limits = {}  # endpoint -> (scope, [Limit]), resolved once per endpoint
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_STORAGE', 'memory')
+        app.config.setdefault('RATELIMITS', {})
+        app.extensions['rate_limiter'] = self
+        if not app.config['RATELIMIT_ENABLED']:
+            return
+
+        storage = app.config['RATELIMIT_STORAGE']
+        if storage == 'memory':
+            self.storage = MemoryStorage()
+        elif storage.startswith('sqlite:///'):
+            self.storage = SQLiteStorage(storage[len('sqlite:///'):])
+        else:
+            raise ValueError(f"RATELIMIT_STORAGE must be 'memory' or sqlite:///<path>, not {storage!r}")
+
+        self.rules = {
+            name: [Limit(spec) for spec in specs]
+            for name, specs in app.config['RATELIMITS'].items()
+        }
+        app.before_request(self.check)
+
+    def limits_for(self, endpoint):
+        resolved = self._limits.get(endpoint)
+        if resolved is None:
+            blueprint = endpoint.rpartition('.')[0]
+            scope = endpoint if endpoint in self.rules else blueprint
+            resolved = self._limits[endpoint] = (scope, self.rules.get(scope, []))
+        return resolved
+
+    def check(self):
+        """before_request hook: a 429 response when any limit of the endpoint is exhausted"""
+        if request.endpoint is None or request.method == 'OPTIONS':
+            return None
+        scope, limits = self.limits_for(request.endpoint)
+        buckets = []
+        for limit in limits:
+            subject = request.remote_addr if limit.key == 'ip' else _identity()
+            if subject is not None:
+                buckets.append((f'{scope}|{limit.spec}|{subject}', limit.capacity, limit.rate))
+        if not buckets:
+            return None
+
+        # All or nothing, so a request one limit rejects doesn't drain the others
+        allowed, retry_after = self.storage.hit(buckets)
+        if allowed:
+            return None
+        response = jsonify({'message': 'Too many requests, please slow down', 'error': 'rate_limited'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,30 @@
+from collections import defaultdict
+from models import db, ProductFeature
+
+
+def read_query(schema, model):
+    """Query selecting only the columns `schema` dumps, returning plain rows.
+
+    Meant for the public read paths: rows are tuples, so nothing is added to
+    the identity map or tracked by the unit of work, and autoflush is off
+    because these requests never have pending changes. Filter, order and
+    paginate it like any other query, then pass the rows to schema.dump_many.
+    """
+    return db.session.query(*schema.columns(model)).autoflush(False)
+
+
+def attach_features(products, schema=ProductFeature.schema):
+    """Add each product dict's features with a single query, as selectinload would"""
+    if not products:
+        return products
+    
+    features = defaultdict(list)
+    rows = read_query(schema, ProductFeature).filter(
+        ProductFeature.product_id.in_([p['id'] for p in products])
+    ).order_by(ProductFeature.display_order, ProductFeature.id)
+    for feature in schema.dump_many(rows):
+        features[feature['product_id']].append(feature)
+    
+    for product in products:
+        product['features'] = features[product['id']]
+    return products
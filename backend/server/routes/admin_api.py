@@ -5,79 +5,148 @@ from models import (
     Award, Department, StaffMember, BoardMember, ProductCategory, 
     Product, ProductFeature, DownloadableForm
 )
-from werkzeug.utils import secure_filename
-from datetime import datetime
-import os
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload, joinedload, defer
+from cache import VersionedCache, get_versions
+from counters import download_counter
+from images import wants_variants, process_image_async
+from storage import store_upload, upload_size, upload_error
+from pagination import PaginationError, page_requested, paginate, model_fields, get_fields, prune
+from bulk import (
+    BulkError, get_ids, missing_ids, update_params, reorder_params, execute_updates, execute_deletes,
+    sync_features
+)
+from analytics import AnalyticsError, get_window, get_period, total_downloads, top_forms, download_series
+from datetime import datetime, timedelta
 
 admin_api_bp = Blueprint('admin_api', __name__)
 
 # ==================== HELPER FUNCTIONS ====================
 
+# Active status per JWT identity. Any commit touching admin_users (deactivation,
+# password change, login) invalidates it; the TTL covers other worker processes.
+admin_user_cache = VersionedCache(max_entries=256)
+
+
+def get_admin_status(user_id):
+    """Return {'is_active', 'role'} for a JWT identity, cached for ADMIN_USER_CACHE_TTL seconds"""
+    versions = get_versions(('admin_users',))
+    ttl = current_app.config.get('ADMIN_USER_CACHE_TTL', 60)
+    
+    status = admin_user_cache.get(user_id, versions, ttl)
+    if status is None:
+        user = AdminUser.query.get(user_id)
+        status = admin_user_cache.set(user_id, versions, {
+            'is_active': bool(user and user.is_active),
+            'role': user.role if user else None
+        })
+    return status
+
+
 def admin_required(fn):
     """Decorator to check if user is admin"""
     @jwt_required()
     def wrapper(*args, **kwargs):
         user_id = get_jwt_identity()
-        user = AdminUser.query.get(user_id)
-        if not user or not user.is_active:
+        if not get_admin_status(user_id)['is_active']:
             return jsonify({'message': 'Admin access required'}), 403
+        
+        # Uploads are validated while they stream in; report rejections here
+        if request.files:
+            error = upload_error(request.files)
+            if error:
+                message, status = error
+                return jsonify({'message': message}), status
         return fn(*args, **kwargs)
     wrapper.__name__ = fn.__name__
     return wrapper
 
 
 def save_file(file, folder):
-    """Save uploaded file and return URL"""
+    """Save uploaded file under its content hash and return URL"""
     if file and file.filename:
-        # Get the original filename and replace spaces with underscores
-        original_filename = secure_filename(file.filename)
-        original_filename = original_filename.replace(' ', '_')
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        filename = timestamp + original_filename
+        # Identical content is stored once, whichever folder it was uploaded for
+        url, filepath = store_upload(file)
+        current_app.logger.debug(f'Upload stored at {filepath} as {url}')
         
-        # Create the full folder path
-        folder_path = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
+        # Resized WebP variants are generated in the background
+        if wants_variants(folder, filepath):
+            process_image_async(filepath, url, folder)
         
-        # Create directory if it doesn't exist
-        os.makedirs(folder_path, exist_ok=True)
-        
-        # Save the file
-        filepath = os.path.join(folder_path, filename)
-        file.save(filepath)
-        
-        # Log for debugging
-        print(f"File saved to: {filepath}")
-        print(f"File exists: {os.path.exists(filepath)}")
-        print(f"Returning URL: /static/uploads/{folder}/{filename}")
-        
-        return f'/static/uploads/{folder}/{filename}'
+        return url
     return None
+
+
+def list_response(query, sort_column, serialize, descending=False):
+    """Full list by default; {items, next_cursor} when ?limit= or ?cursor= is given"""
+    if page_requested():
+        items, next_cursor = paginate(query, sort_column, sort_column.class_.id, descending)
+        return jsonify({'items': [serialize(i) for i in items], 'next_cursor': next_cursor}), 200
+    
+    order = sort_column.desc() if descending else sort_column
+    return jsonify([serialize(i) for i in query.order_by(order).all()]), 200
+
 # ==================== DASHBOARD STATS ====================
 
+# Counted tables, keyed by the name of their stat
+DASHBOARD_COUNTS = {
+    'total_products': Product,
+    'total_staff': StaffMember,
+    'total_board_members': BoardMember,
+    'total_departments': Department,
+    'total_downloads': DownloadableForm,
+    'total_news': NewsUpdate,
+    'total_sliders': SliderImage,
+}
+DASHBOARD_TABLES = tuple(m.__tablename__ for m in DASHBOARD_COUNTS.values()) + ('download_days', 'download_months')
+
+# Whole dashboard payload; any commit to a counted table rebuilds it
+dashboard_cache = VersionedCache(max_entries=1)
+
+
+def dashboard_stats_query():
+    """Every dashboard count (and the summed download counts) as one row"""
+    columns = [
+        select(func.count()).select_from(model).scalar_subquery().label(name)
+        for name, model in DASHBOARD_COUNTS.items()
+    ]
+    columns.append(
+        select(func.coalesce(func.sum(DownloadableForm.download_count), 0)).scalar_subquery().label('total_download_count')
+    )
+    today = datetime.utcnow().date()
+    for days in (7, 30):
+        columns.append(
+            total_downloads(today - timedelta(days=days - 1), today).scalar_subquery().label(f'downloads_last_{days}_days')
+        )
+    return select(*columns)
+
+
 @admin_api_bp.route('/dashboard/stats', methods=['GET'])
 @admin_required
 def dashboard_stats():
     """Get dashboard statistics"""
     try:
-        stats = {
-            'total_products': Product.query.count(),
-            'total_staff': StaffMember.query.count(),
-            'total_board_members': BoardMember.query.count(),
-            'total_departments': Department.query.count(),
-            'total_downloads': DownloadableForm.query.count(),
-            'total_news': NewsUpdate.query.count(),
-            'total_sliders': SliderImage.query.count(),
-        }
-        
-        recent_news = NewsUpdate.query.order_by(NewsUpdate.created_at.desc()).limit(5).all()
-        recent_downloads = DownloadableForm.query.order_by(DownloadableForm.created_at.desc()).limit(5).all()
-        
-        return jsonify({
-            'stats': stats,
-            'recent_news': [n.to_dict(include_content=False) for n in recent_news],
-            'recent_downloads': [d.to_dict() for d in recent_downloads]
-        }), 200
+        versions = get_versions(DASHBOARD_TABLES)
+        payload = dashboard_cache.get('dashboard', versions, current_app.config.get('DASHBOARD_CACHE_TTL', 30))
+        if payload is None:
+            stats = dict(db.session.execute(dashboard_stats_query()).one()._mapping)
+            
+            recent_news = NewsUpdate.query.options(defer(NewsUpdate.content)).order_by(
+                NewsUpdate.created_at.desc()
+            ).limit(5).all()
+            recent_downloads = DownloadableForm.query.order_by(DownloadableForm.created_at.desc()).limit(5).all()
+            top_downloads = DownloadableForm.query.filter(DownloadableForm.download_count > 0).order_by(
+                DownloadableForm.download_count.desc()
+            ).limit(5).all()
+            
+            payload = dashboard_cache.set('dashboard', versions, {
+                'stats': stats,
+                'recent_news': [n.to_dict(include_content=False) for n in recent_news],
+                'recent_downloads': [d.to_dict() for d in recent_downloads],
+                'top_downloads': [d.to_dict() for d in top_downloads]
+            })
+        
+        return jsonify(payload), 200
     except Exception as e:
         return jsonify({'message': 'Failed to fetch stats', 'error': str(e)}), 500
 
@@ -179,13 +248,20 @@ def get_all_news():
     """Get all news"""
     try:
         category = request.args.get('category')
+        fields = get_fields(model_fields(NewsUpdate))
+        # Content is the heavy column; only load it when ?fields= asks for it
+        include_content = fields is not None and 'content' in fields
         query = NewsUpdate.query
+        if not include_content:
+            query = query.options(defer(NewsUpdate.content))
         
         if category:
             query = query.filter_by(category=category)
         
-        news = query.order_by(NewsUpdate.publish_date.desc()).all()
-        return jsonify([n.to_dict(include_content=False) for n in news]), 200
+        return list_response(query, NewsUpdate.publish_date,
+                             lambda n: prune(n.to_dict(include_content=include_content), fields), descending=True)
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch news', 'error': str(e)}), 500
 
@@ -476,7 +552,10 @@ def get_departments():
     """Get all departments"""
     try:
         include_staff = request.args.get('include_staff', 'false').lower() == 'true'
-        departments = Department.query.order_by(Department.display_order).all()
+        query = Department.query
+        if include_staff:
+            query = query.options(selectinload(Department.staff_members))
+        departments = query.order_by(Department.display_order).all()
         return jsonify([d.to_dict(include_staff=include_staff) for d in departments]), 200
     except Exception as e:
         return jsonify({'message': 'Failed to fetch departments', 'error': str(e)}), 500
@@ -567,13 +646,19 @@ def get_staff():
         department_id = request.args.get('department_id')
         include_department = request.args.get('include_department', 'false').lower() == 'true'
         
+        fields = get_fields(model_fields(StaffMember, 'department'))
+        
         query = StaffMember.query
+        if include_department:
+            query = query.options(joinedload(StaffMember.department))
         
         if department_id:
             query = query.filter_by(department_id=department_id)
         
-        staff = query.order_by(StaffMember.display_order).all()
-        return jsonify([s.to_dict(include_department=include_department) for s in staff]), 200
+        return list_response(query, StaffMember.display_order,
+                             lambda s: prune(s.to_dict(include_department=include_department), fields))
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch staff', 'error': str(e)}), 500
 
@@ -770,7 +855,10 @@ def get_product_categories():
     """Get all product categories"""
     try:
         include_products = request.args.get('include_products', 'false').lower() == 'true'
-        categories = ProductCategory.query.order_by(ProductCategory.display_order).all()
+        query = ProductCategory.query
+        if include_products:
+            query = query.options(selectinload(ProductCategory.products).selectinload(Product.features))
+        categories = query.order_by(ProductCategory.display_order).all()
         return jsonify([c.to_dict(include_products=include_products) for c in categories]), 200
     except Exception as e:
         return jsonify({'message': 'Failed to fetch product categories', 'error': str(e)}), 500
@@ -855,13 +943,21 @@ def get_products():
         include_features = request.args.get('include_features', 'true').lower() == 'true'
         include_category = request.args.get('include_category', 'false').lower() == 'true'
         
+        fields = get_fields(model_fields(Product, 'features', 'category'))
+        
         query = Product.query
+        if include_features:
+            query = query.options(selectinload(Product.features))
+        if include_category:
+            query = query.options(joinedload(Product.category))
         
         if category_id:
             query = query.filter_by(product_category_id=category_id)
         
-        products = query.order_by(Product.display_order).all()
-        return jsonify([p.to_dict(include_features=include_features, include_category=include_category) for p in products]), 200
+        return list_response(query, Product.display_order,
+                             lambda p: prune(p.to_dict(include_features=include_features, include_category=include_category), fields))
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch products', 'error': str(e)}), 500
 
@@ -938,24 +1034,15 @@ def update_product(id):
         product.is_active = data.get('is_active', product.is_active)
         product.updated_at = datetime.utcnow()
         
-        # Update features if provided
+        # Update features if provided, touching only the ones that changed
         if 'features' in data:
-            # Delete existing features
-            ProductFeature.query.filter_by(product_id=product.id).delete()
-            
-            # Add new features
-            features = data.get('features', [])
-            for idx, feature_text in enumerate(features):
-                if feature_text.strip():
-                    feature = ProductFeature(
-                        product_id=product.id,
-                        feature_text=feature_text,
-                        display_order=idx
-                    )
-                    db.session.add(feature)
+            sync_features(product.id, data.get('features') or [])
         
         db.session.commit()
         return jsonify(product.to_dict(include_features=True)), 200
+    except BulkError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Failed to update product', 'error': str(e)}), 500
@@ -981,13 +1068,16 @@ def get_forms():
     """Get all downloadable forms"""
     try:
         category = request.args.get('category')
+        fields = get_fields(model_fields(DownloadableForm))
         query = DownloadableForm.query
         
         if category:
             query = query.filter_by(category=category)
         
-        forms = query.order_by(DownloadableForm.upload_date.desc()).all()
-        return jsonify([f.to_dict() for f in forms]), 200
+        return list_response(query, DownloadableForm.upload_date,
+                             lambda f: prune(f.to_dict(), fields), descending=True)
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch forms', 'error': str(e)}), 500
 
@@ -1005,8 +1095,7 @@ def create_form():
         file_url = save_file(file, 'forms')
         
         # Get file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
+        file_size = upload_size(file)
         file_size_mb = round(file_size / (1024 * 1024), 2)
         
         # Get file type
@@ -1053,8 +1142,7 @@ def update_form(id):
             form.file_url = file_url
             
             # Update file info
-            file.seek(0, os.SEEK_END)
-            file_size = file.tell()
+            file_size = upload_size(file)
             file_size_mb = round(file_size / (1024 * 1024), 2)
             form.file_size = f'{file_size_mb} MB'
             form.file_type = file.filename.rsplit('.', 1)[1].upper() if '.' in file.filename else 'PDF'
@@ -1089,9 +1177,173 @@ def track_form_download(id):
     """Increment download count"""
     try:
         form = DownloadableForm.query.get_or_404(id)
-        form.download_count += 1
+        pending = download_counter.increment(form.id)
+        return jsonify({'message': 'Download tracked', 'download_count': (form.download_count or 0) + pending}), 200
+    except Exception as e:
+        return jsonify({'message': 'Failed to track download', 'error': str(e)}), 500
+
+
+# ==================== DOWNLOAD ANALYTICS ====================
+
+@admin_api_bp.route('/analytics/downloads/top', methods=['GET'])
+@admin_required
+def top_downloaded_forms():
+    """Most downloaded forms over a window (?days= or ?start=&end=, &limit=)"""
+    try:
+        start, end = get_window(request.args)
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        return jsonify({
+            'start': start,
+            'end': end,
+            'total_downloads': db.session.execute(total_downloads(start, end)).scalar(),
+            'forms': top_forms(start, end, limit)
+        }), 200
+    except AnalyticsError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch download analytics', 'error': str(e)}), 500
+
+@admin_api_bp.route('/analytics/downloads/series', methods=['GET'])
+@admin_required
+def downloads_series():
+    """Downloads of all forms per day, week or month (?period=)"""
+    try:
+        start, end = get_window(request.args)
+        period = get_period(request.args)
+        return jsonify({
+            'start': start,
+            'end': end,
+            'period': period,
+            'series': download_series(start, end, period)
+        }), 200
+    except AnalyticsError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch download analytics', 'error': str(e)}), 500
+
+@admin_api_bp.route('/analytics/downloads/forms/<int:id>', methods=['GET'])
+@admin_required
+def form_downloads_series(id):
+    """Downloads of one form per day, week or month (?period=)"""
+    try:
+        form = db.session.get(DownloadableForm, id)
+        if form is None:
+            return jsonify({'message': 'Form not found'}), 404
+        start, end = get_window(request.args)
+        period = get_period(request.args)
+        return jsonify({
+            'form_id': form.id,
+            'title': form.title,
+            'start': start,
+            'end': end,
+            'period': period,
+            'series': download_series(start, end, period, form_id=form.id)
+        }), 200
+    except AnalyticsError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch download analytics', 'error': str(e)}), 500
+
+
+# ==================== BULK OPERATIONS ====================
+
+# Collection URL name -> (model, label, fields a bulk PATCH may set).
+# File columns are left out; they only change through uploads.
+BULK_COLLECTIONS = {
+    'sliders': (SliderImage, 'Sliders', ['title', 'subtitle', 'link_url', 'display_order', 'is_active']),
+    'news': (NewsUpdate, 'News', ['title', 'category', 'excerpt', 'author', 'is_featured']),
+    'values': (CoreValue, 'Core values', ['title', 'description', 'icon_class', 'display_order']),
+    'awards': (Award, 'Awards', ['title', 'year', 'description', 'display_order']),
+    'departments': (Department, 'Departments', [
+        'name', 'slug', 'description', 'key_responsibilities', 'icon_class', 'display_order', 'is_active'
+    ]),
+    'staff': (StaffMember, 'Staff members', [
+        'department_id', 'full_name', 'position', 'email', 'phone', 'education', 'bio', 'display_order', 'is_active'
+    ]),
+    'board': (BoardMember, 'Board members', [
+        'full_name', 'position', 'category', 'email', 'phone', 'education', 'bio', 'display_order', 'is_active'
+    ]),
+    'product-categories': (ProductCategory, 'Product categories', ['name', 'slug', 'description', 'display_order']),
+    'products': (Product, 'Products', [
+        'product_category_id', 'name', 'slug', 'max_amount', 'description', 'repayment_period',
+        'interest_rate', 'icon_class', 'is_popular', 'display_order', 'is_active'
+    ]),
+    'forms': (DownloadableForm, 'Forms', ['title', 'category', 'is_active'])
+}
+BULK_ROUTE = '/<any(' + ', '.join(f'"{name}"' for name in BULK_COLLECTIONS) + '):collection>'
+
+
+def not_found_response(ids):
+    return jsonify({'message': 'Some records were not found', 'missing_ids': ids}), 404
+
+
+@admin_api_bp.route(BULK_ROUTE + '/bulk', methods=['PATCH'])
+@admin_required
+def bulk_update(collection):
+    """Partially update many records in one transaction ({"items": [{"id": 1, ...}, ...]})"""
+    model, label, fields = BULK_COLLECTIONS[collection]
+    try:
+        groups = update_params(model, (request.get_json(silent=True) or {}).get('items'), fields)
+        ids = [params['id'] for group in groups for params in group]
+    except BulkError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    try:
+        missing = missing_ids(model, ids)
+        if missing:
+            return not_found_response(missing)
+        
+        execute_updates(model, groups)
+        db.session.commit()
+        return jsonify({'message': f'{label} updated successfully', 'count': len(ids)}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Failed to update {label.lower()}', 'error': str(e)}), 500
+
+
+@admin_api_bp.route(BULK_ROUTE + '/reorder', methods=['POST'])
+@admin_required
+def bulk_reorder(collection):
+    """Set display_order from an ordered id list ({"ids": [3, 1, 2]})"""
+    model, label, fields = BULK_COLLECTIONS[collection]
+    if 'display_order' not in fields:
+        return jsonify({'message': f'{label} cannot be reordered'}), 400
+    try:
+        ids = get_ids(request.get_json(silent=True))
+    except BulkError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    try:
+        missing = missing_ids(model, ids)
+        if missing:
+            return not_found_response(missing)
+        
+        execute_updates(model, [reorder_params(model, ids)])
+        db.session.commit()
+        return jsonify({'message': f'{label} reordered successfully', 'count': len(ids)}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Failed to reorder {label.lower()}', 'error': str(e)}), 500
+
+
+@admin_api_bp.route(BULK_ROUTE + '/bulk', methods=['DELETE'])
+@admin_required
+def bulk_delete(collection):
+    """Delete many records (and their cascaded children) in one transaction ({"ids": [...]})"""
+    model, label, fields = BULK_COLLECTIONS[collection]
+    try:
+        ids = get_ids(request.get_json(silent=True))
+    except BulkError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    try:
+        missing = missing_ids(model, ids)
+        if missing:
+            return not_found_response(missing)
+        
+        count = execute_deletes(model, ids)
         db.session.commit()
-        return jsonify({'message': 'Download tracked', 'download_count': form.download_count}), 200
+        return jsonify({'message': f'{label} deleted successfully', 'count': count}), 200
     except Exception as e:
         db.session.rollback()
-        return jsonify({'message': 'Failed to track download', 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'message': f'Failed to delete {label.lower()}', 'error': str(e)}), 500
\ No newline at end of file
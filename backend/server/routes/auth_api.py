@@ -1,10 +1,19 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from models import db, AdminUser
+from passwords import PasswordHasherBusy
 from datetime import datetime
 
 auth_api_bp = Blueprint('auth_api', __name__)
 
+
+def busy_response(error):
+    """503 for a password check refused by the hashing pool; clients may retry shortly"""
+    response = jsonify({'message': 'Server busy, please try again', 'error': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @auth_api_bp.route('/login', methods=['POST'])
 def login():
     """Admin login endpoint"""
@@ -23,6 +32,10 @@ def login():
         ).first()
         
         if user and user.check_password(password) and user.is_active:
+            # Upgrade hashes made with older parameters while the password is at hand
+            if user.password_needs_rehash():
+                user.set_password(password)
+            
             # Update last login
             user.last_login = datetime.utcnow()
             db.session.commit()
@@ -40,6 +53,8 @@ def login():
         
         return jsonify({'message': 'Invalid username or password'}), 401
     
+    except PasswordHasherBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({'message': 'Login failed', 'error': str(e)}), 500
 
@@ -101,6 +116,9 @@ def change_password():
         
         return jsonify({'message': 'Password changed successfully'}), 200
     
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Failed to change password', 'error': str(e)}), 500
\ No newline at end of file
@@ -1,26 +1,65 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, redirect
+from werkzeug.exceptions import NotFound
+from werkzeug.http import is_resource_modified
+from werkzeug.utils import secure_filename
 from models import (
     SliderImage, NewsUpdate, Department, StaffMember, BoardMember, 
     Product, ProductCategory, DownloadableForm, AboutContent, CoreValue, Award, db
 )
+from cache import cached_response, VersionedCache
+from readonly import read_query, attach_features
+from snapshots import Snapshot
+from counters import download_counter
+from storage import send_upload
+from search import DOC_TYPES, search_documents
+from pagination import PaginationError, page_requested, paginate, get_limit, model_fields, get_fields
+import os
 
 # Modify your existing public_bp to return JSON
 public_api_bp = Blueprint('public_api', __name__, url_prefix='/api/public')
 
+# Columns the public pages render, selected as plain rows instead of loading
+# entities. Timestamps only matter to the admin, so they're not fetched.
+PUBLIC_SLIDER = SliderImage.schema.without('created_at', 'updated_at')
+PUBLIC_NEWS = NewsUpdate.schema.without('created_at', 'updated_at').extend('content')
+PUBLIC_PRODUCT = Product.schema.without('created_at', 'updated_at')
+PUBLIC_DEPARTMENT = Department.schema.without('created_at', 'updated_at')
+PUBLIC_STAFF = StaffMember.schema.without('created_at', 'updated_at')
+PUBLIC_BOARD = BoardMember.schema.without('created_at', 'updated_at')
+
+# The news and downloads lists keep every column, since ?fields= may ask for any
+NEWS_WITH_CONTENT = NewsUpdate.schema.extend('content')
+
+BOARD_CATEGORIES = {'Executive': 'executive', 'Board': 'board', 'Supervisory': 'supervisory'}
+
+def home_payload():
+    """Home page data, as stored in the home snapshot"""
+    sliders = read_query(PUBLIC_SLIDER, SliderImage).filter_by(is_active=True).order_by(SliderImage.display_order).limit(5)
+    news = read_query(PUBLIC_NEWS, NewsUpdate).order_by(NewsUpdate.publish_date.desc()).limit(3)
+    featured_products = read_query(PUBLIC_PRODUCT, Product).filter_by(is_popular=True, is_active=True).limit(3)
+    
+    return {
+        'sliders': PUBLIC_SLIDER.dump_many(sliders),
+        'news': PUBLIC_NEWS.dump_many(news),
+        'featured_products': attach_features(PUBLIC_PRODUCT.dump_many(featured_products))
+    }
+
+
+home_snapshot = Snapshot('home', ('slider_images', 'news_updates', 'products', 'product_features'), home_payload)
+
+
+@public_api_bp.record_once
+def init_snapshots(state):
+    home_snapshot.init_app(state.app)
+
+
 @public_api_bp.route('/home')
 def home():
-    """Get home page data"""
-    sliders = SliderImage.query.filter_by(is_active=True).order_by(SliderImage.display_order).limit(5).all()
-    news = NewsUpdate.query.order_by(NewsUpdate.publish_date.desc()).limit(3).all()
-    featured_products = Product.query.filter_by(is_popular=True, is_active=True).limit(3).all()
-    
-    return jsonify({
-        'sliders': [s.to_dict() for s in sliders],
-        'news': [n.to_dict() for n in news],
-        'featured_products': [p.to_dict() for p in featured_products]
-    })
+    """Get home page data (served from the pre-encoded snapshot)"""
+    return home_snapshot.response()
 
 @public_api_bp.route('/about')
+@cached_response('about_content', 'core_values', 'awards')
 def about():
     """Get about page data"""
     about_content = AboutContent.query.filter_by(section_key='brief').first()
@@ -38,108 +77,230 @@ def about():
     })
 
 @public_api_bp.route('/departments')
+@cached_response('departments', 'staff_members')
 def departments():
     """Get all departments"""
-    departments = Department.query.filter_by(is_active=True).order_by(Department.display_order).all()
-    return jsonify([d.to_dict() for d in departments])
+    departments = read_query(PUBLIC_DEPARTMENT, Department).filter_by(is_active=True).order_by(Department.display_order)
+    return jsonify(PUBLIC_DEPARTMENT.dump_many(departments))
 
 @public_api_bp.route('/departments/<slug>')
+@cached_response('departments', 'staff_members')
 def department_detail(slug):
     """Get department detail with staff"""
-    department = Department.query.filter_by(slug=slug, is_active=True).first()
+    department = read_query(PUBLIC_DEPARTMENT, Department).filter_by(slug=slug, is_active=True).first()
     if not department:
         return jsonify({'error': 'Department not found'}), 404
     
-    staff = StaffMember.query.filter_by(department_id=department.id, is_active=True).order_by(StaffMember.display_order).all()
+    staff = read_query(PUBLIC_STAFF, StaffMember).filter_by(department_id=department.id, is_active=True).order_by(StaffMember.display_order)
     
     return jsonify({
-        'department': department.to_dict(),
-        'staff': [s.to_dict() for s in staff]
+        'department': PUBLIC_DEPARTMENT.dump(department),
+        'staff': PUBLIC_STAFF.dump_many(staff)
     })
 
+@public_api_bp.route('/directory')
+@cached_response('departments', 'staff_members')
+def directory():
+    """All active departments, each with its active staff, in two queries"""
+    departments = PUBLIC_DEPARTMENT.dump_many(
+        read_query(PUBLIC_DEPARTMENT, Department).filter_by(is_active=True).order_by(Department.display_order)
+    )
+    by_department = {}
+    for department in departments:
+        department['staff'] = by_department[department['id']] = []
+    
+    if by_department:
+        staff = read_query(PUBLIC_STAFF, StaffMember).filter(
+            StaffMember.department_id.in_(by_department)
+        ).filter_by(is_active=True).order_by(StaffMember.display_order, StaffMember.id)
+        for member in PUBLIC_STAFF.dump_many(staff):
+            by_department[member['department_id']].append(member)
+    
+    return jsonify(departments)
+
 @public_api_bp.route('/board')
+@cached_response('board_members')
 def board():
     """Get board members"""
-    executive = BoardMember.query.filter_by(category='Executive', is_active=True).order_by(BoardMember.display_order).all()
-    board = BoardMember.query.filter_by(category='Board', is_active=True).order_by(BoardMember.display_order).all()
-    supervisory = BoardMember.query.filter_by(category='Supervisory', is_active=True).order_by(BoardMember.display_order).all()
+    members = read_query(PUBLIC_BOARD, BoardMember).filter_by(is_active=True).filter(
+        BoardMember.category.in_(BOARD_CATEGORIES)
+    ).order_by(BoardMember.display_order)
     
-    return jsonify({
-        'executive': [e.to_dict() for e in executive],
-        'board': [b.to_dict() for b in board],
-        'supervisory': [s.to_dict() for s in supervisory]
-    })
+    # One query for all three groups, split by category
+    data = {key: [] for key in BOARD_CATEGORIES.values()}
+    for member in PUBLIC_BOARD.dump_many(members):
+        data[BOARD_CATEGORIES[member['category']]].append(member)
+    return jsonify(data)
 
 @public_api_bp.route('/products')
+@cached_response('product_categories', 'products', 'product_features')
 def products():
     """Get products with optional category filter"""
-    categories = ProductCategory.query.order_by(ProductCategory.display_order).all()
+    categories = ProductCategory.schema.dump_many(
+        read_query(ProductCategory.schema, ProductCategory).order_by(ProductCategory.display_order)
+    )
     category_slug = request.args.get('category')
     
+    product_query = read_query(PUBLIC_PRODUCT, Product)
+    
     if category_slug:
-        category = ProductCategory.query.filter_by(slug=category_slug).first()
-        products = Product.query.filter_by(product_category_id=category.id, is_active=True).order_by(Product.display_order).all() if category else []
+        category = next((c for c in categories if c['slug'] == category_slug), None)
+        products = product_query.filter_by(product_category_id=category['id'], is_active=True).order_by(Product.display_order) if category else []
     else:
-        products = Product.query.filter_by(is_active=True).order_by(Product.display_order).all()
+        products = product_query.filter_by(is_active=True).order_by(Product.display_order)
     
     return jsonify({
-        'categories': [c.to_dict() for c in categories],
-        'products': [p.to_dict() for p in products]
+        'categories': categories,
+        'products': attach_features(PUBLIC_PRODUCT.dump_many(products))
     })
 
+# Every ?search= and ?cursor= is a new key, so these are cached apart from the other responses
+downloads_cache = VersionedCache(max_entries=256)
+
 @public_api_bp.route('/downloads')
+@cached_response('downloadable_forms', cache=downloads_cache)
 def downloads():
     """Get downloadable forms"""
     category = request.args.get('category')
     search = request.args.get('search')
     
-    query = DownloadableForm.query.filter_by(is_active=True)
+    try:
+        fields = get_fields(model_fields(DownloadableForm))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = read_query(DownloadableForm.schema, DownloadableForm).filter_by(is_active=True)
     
     if category:
         query = query.filter_by(category=category)
     if search:
         query = query.filter(DownloadableForm.title.ilike(f'%{search}%'))
     
-    forms = query.order_by(DownloadableForm.upload_date.desc()).all()
+    next_cursor = None
+    if page_requested():
+        try:
+            forms, next_cursor = paginate(query, DownloadableForm.upload_date, DownloadableForm.id)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        forms = query.order_by(DownloadableForm.upload_date.desc())
     categories_list = db.session.query(DownloadableForm.category).distinct().all()
     
-    return jsonify({
-        'forms': [f.to_dict() for f in forms],
+    data = {
+        'forms': DownloadableForm.schema.only(fields).dump_many(forms),
         'categories': [c[0] for c in categories_list if c[0]]
-    })
+    }
+    if page_requested():
+        data['next_cursor'] = next_cursor
+    return jsonify(data)
 
 @public_api_bp.route('/downloads/<int:id>/track', methods=['POST'])
 def track_download(id):
     """Track download count for a form"""
     try:
-        form = DownloadableForm.query.get(id)
-        if not form:
+        stored = db.session.query(DownloadableForm.download_count).filter_by(id=id).first()
+        if not stored:
             return jsonify({'error': 'Form not found'}), 404
         
-        # Increment download count
-        form.download_count = (form.download_count or 0) + 1
-        
-        db.session.commit()
+        # Increment is buffered and written to the database in batches
+        pending = download_counter.increment(id)
         
         return jsonify({
             'success': True,
-            'download_count': form.download_count
+            'download_count': (stored[0] or 0) + pending
         })
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@public_api_bp.route('/downloads/<int:id>/file')
+def download_file(id):
+    """Send a form's file and count the download (replaces GET file + POST track)"""
+    form = db.session.query(
+        DownloadableForm.title, DownloadableForm.file_url
+    ).filter_by(id=id, is_active=True).first()
+    if not form or not form.file_url:
+        return jsonify({'error': 'Form not found'}), 404
+    
+    if form.file_url.startswith('/static/uploads/'):
+        relative_path = form.file_url[len('/static/uploads/'):]
+        download_name = (secure_filename(form.title) or 'download') + os.path.splitext(relative_path)[1]
+        try:
+            # The form can be pointed at a new file, so this URL is never immutable
+            response = send_upload(relative_path, download_name=download_name, immutable=False)
+        except NotFound:
+            return jsonify({'error': 'File not found'}), 404
+    else:
+        response = redirect(form.file_url)
+    
+    # Count whole downloads only: not revalidations (304) or resumed ranges.
+    # Offloaded files are 200 here even when nginx answers 304, so also
+    # compare the conditional headers with the file's validators.
+    range_start = request.range.ranges[0][0] if request.range else 0
+    revalidated = (request.if_none_match or request.if_modified_since) and not is_resource_modified(
+        request.environ, etag=response.get_etag()[0], last_modified=response.last_modified
+    )
+    if response.status_code in (200, 206, 302) and range_start == 0 and not revalidated:
+        # Buffered in memory and written in batches, off the response path
+        download_counter.increment(id)
+    return response
+
 @public_api_bp.route('/news')
+@cached_response('news_updates')
 def news():
-    """Get all news"""
-    news_list = NewsUpdate.query.order_by(NewsUpdate.publish_date.desc()).all()
-    return jsonify([n.to_dict() for n in news_list])
+    """Get all news, optionally paginated (?limit=&cursor=) and pruned (?fields=)"""
+    try:
+        fields = get_fields(model_fields(NewsUpdate))
+        # Content is the heavy column; only select it when it's wanted
+        schema = NEWS_WITH_CONTENT if fields is None or 'content' in fields else NewsUpdate.schema
+        query = read_query(schema, NewsUpdate)
+        
+        if page_requested():
+            news_list, next_cursor = paginate(query, NewsUpdate.publish_date, NewsUpdate.id)
+            return jsonify({
+                'items': schema.only(fields).dump_many(news_list),
+                'next_cursor': next_cursor
+            })
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    news_list = query.order_by(NewsUpdate.publish_date.desc())
+    return jsonify(schema.only(fields).dump_many(news_list))
 
 @public_api_bp.route('/news/<int:id>')
+@cached_response('news_updates')
 def news_detail(id):
     """Get single news article"""
     news_item = NewsUpdate.query.get(id)
     if not news_item:
         return jsonify({'error': 'News not found'}), 404
     
-    return jsonify(news_item.to_dict())
\ No newline at end of file
+    return jsonify(news_item.to_dict())
+
+# Every new ?q= is a new key, so searches are cached apart from the other responses
+search_cache = VersionedCache(max_entries=256)
+
+@public_api_bp.route('/search')
+@cached_response('news_updates', 'downloadable_forms', 'products', 'product_features', 'staff_members',
+                 cache=search_cache)
+def search():
+    """Ranked full-text search (?q=&types=news,form,product,staff&limit=)"""
+    terms = request.args.get('q', '').strip()
+    if not terms:
+        return jsonify({'error': 'Search query is required'}), 400
+    
+    doc_types = None
+    if request.args.get('types'):
+        doc_types = [t.strip() for t in request.args.get('types').split(',')]
+        unknown = set(doc_types) - set(DOC_TYPES)
+        if unknown:
+            return jsonify({'error': f"Unknown types: {', '.join(sorted(unknown))}"}), 400
+    
+    try:
+        limit = get_limit()
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'query': terms,
+        'results': search_documents(terms, doc_types, limit)
+    })
\ No newline at end of file
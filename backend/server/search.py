@@ -0,0 +1,269 @@
+from sqlalchemy import event, text
+from models import db
+import html
+import re
+
+# ==================== SQLITE FTS5 INDEX ====================
+# One FTS5 table holds every searchable document. Its rowid is id * 8 + type
+# code, so the sync triggers update a document by primary key instead of
+# scanning the index. Inactive forms, products and staff are left out.
+
+# Highlight markers; the text is HTML-escaped afterwards and these become <mark>
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+DOC_TYPES = {
+    'news': 1,
+    'form': 2,
+    'product': 3,
+    'staff': 4
+}
+
+_PRODUCT_DOC = """
+    SELECT p.id * 8 + 3, 'product', p.id, p.name,
+           coalesce(p.description, '') || ' ' ||
+           coalesce((SELECT group_concat(f.feature_text, ' ') FROM product_features f
+                     WHERE f.product_id = p.id), '')
+    FROM products p WHERE p.id = {id} AND p.is_active = 1
+"""
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        doc_type UNINDEXED, doc_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+
+    # News
+    """CREATE TRIGGER IF NOT EXISTS search_news_ai AFTER INSERT ON news_updates BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 1, 'news', NEW.id, NEW.title,
+                coalesce(NEW.excerpt, '') || ' ' || coalesce(NEW.content, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_news_au AFTER UPDATE ON news_updates BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 1;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 1, 'news', NEW.id, NEW.title,
+                coalesce(NEW.excerpt, '') || ' ' || coalesce(NEW.content, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_news_ad AFTER DELETE ON news_updates BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 1;
+    END""",
+
+    # Downloadable forms
+    """CREATE TRIGGER IF NOT EXISTS search_forms_ai AFTER INSERT ON downloadable_forms
+    WHEN NEW.is_active = 1 BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 2, 'form', NEW.id, NEW.title, coalesce(NEW.category, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_forms_au AFTER UPDATE OF title, category, is_active
+    ON downloadable_forms BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 2;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        SELECT NEW.id * 8 + 2, 'form', NEW.id, NEW.title, coalesce(NEW.category, '')
+        WHERE NEW.is_active = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_forms_ad AFTER DELETE ON downloadable_forms BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 2;
+    END""",
+
+    # Products, with their features folded into the body
+    f"""CREATE TRIGGER IF NOT EXISTS search_products_ai AFTER INSERT ON products BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_products_au AFTER UPDATE ON products BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 3;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.id')};
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_products_ad AFTER DELETE ON products BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 3;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_features_ai AFTER INSERT ON product_features BEGIN
+        DELETE FROM search_index WHERE rowid = NEW.product_id * 8 + 3;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.product_id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_features_au AFTER UPDATE ON product_features BEGIN
+        DELETE FROM search_index WHERE rowid IN (OLD.product_id * 8 + 3, NEW.product_id * 8 + 3);
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='OLD.product_id')};
+        INSERT OR REPLACE INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='NEW.product_id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_features_ad AFTER DELETE ON product_features BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.product_id * 8 + 3;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        {_PRODUCT_DOC.format(id='OLD.product_id')};
+    END""",
+
+    # Staff
+    """CREATE TRIGGER IF NOT EXISTS search_staff_ai AFTER INSERT ON staff_members
+    WHEN NEW.is_active = 1 BEGIN
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        VALUES (NEW.id * 8 + 4, 'staff', NEW.id, NEW.full_name, coalesce(NEW.position, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_staff_au AFTER UPDATE OF full_name, position, is_active
+    ON staff_members BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 4;
+        INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+        SELECT NEW.id * 8 + 4, 'staff', NEW.id, NEW.full_name, coalesce(NEW.position, '')
+        WHERE NEW.is_active = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_staff_ad AFTER DELETE ON staff_members BEGIN
+        DELETE FROM search_index WHERE rowid = OLD.id * 8 + 4;
+    END"""
+]
+
+# Rebuilds the whole index from the source tables (idempotent)
+SQLITE_BACKFILL = [
+    "DELETE FROM search_index",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT id * 8 + 1, 'news', id, title, coalesce(excerpt, '') || ' ' || coalesce(content, '')
+       FROM news_updates""",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT id * 8 + 2, 'form', id, title, coalesce(category, '')
+       FROM downloadable_forms WHERE is_active = 1""",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT p.id * 8 + 3, 'product', p.id, p.name,
+              coalesce(p.description, '') || ' ' ||
+              coalesce((SELECT group_concat(f.feature_text, ' ') FROM product_features f
+                        WHERE f.product_id = p.id), '')
+       FROM products p WHERE p.is_active = 1""",
+    """INSERT INTO search_index (rowid, doc_type, doc_id, title, body)
+       SELECT id * 8 + 4, 'staff', id, full_name, coalesce(position, '')
+       FROM staff_members WHERE is_active = 1"""
+]
+
+SQLITE_SEARCH = """
+    SELECT doc_type, doc_id,
+           highlight(search_index, 2, :mark_start, :mark_end) AS title,
+           snippet(search_index, 3, :mark_start, :mark_end, '…', 16) AS snippet,
+           bm25(search_index, 0.0, 0.0, 10.0, 1.0) AS score
+    FROM search_index
+    WHERE search_index MATCH :query {type_filter}
+    ORDER BY score
+    LIMIT :limit
+"""
+
+
+# ==================== POSTGRES FULL-TEXT ====================
+# Same documents as tsvector expressions; the migration adds GIN indexes on
+# exactly these expressions so the @@ matches are index-backed.
+
+PG_DOCUMENTS = {
+    'news': ("news_updates", "title",
+             "coalesce(title, '') || ' ' || coalesce(excerpt, '') || ' ' || coalesce(content, '')",
+             "TRUE"),
+    'form': ("downloadable_forms", "title",
+             "coalesce(title, '') || ' ' || coalesce(category, '')",
+             "is_active"),
+    'product': ("products", "name",
+                "coalesce(name, '') || ' ' || coalesce(description, '')",
+                "is_active"),
+    'staff': ("staff_members", "full_name",
+              "coalesce(full_name, '') || ' ' || coalesce(position, '')",
+              "is_active")
+}
+
+PG_SEARCH = """
+    WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query),
+    hits AS (
+        {hits}
+        ORDER BY score DESC
+        LIMIT :limit
+    )
+    SELECT doc_type, doc_id,
+           ts_headline('english', title, q.query, :title_options) AS title,
+           ts_headline('english', body, q.query, :snippet_options) AS snippet,
+           score
+    FROM hits, q
+    ORDER BY score DESC
+"""
+
+
+def _pg_hits(doc_type):
+    table, title, document, active = PG_DOCUMENTS[doc_type]
+    match = f"to_tsvector('english', {document}) @@ q.query"
+    if doc_type == 'product':
+        # Features live in their own table (and have their own GIN index)
+        match = (f"({match} OR EXISTS (SELECT 1 FROM product_features f WHERE f.product_id = t.id "
+                 f"AND to_tsvector('english', f.feature_text) @@ q.query))")
+    return (f"SELECT '{doc_type}' AS doc_type, t.id AS doc_id, t.{title} AS title, {document} AS body, "
+            f"ts_rank(to_tsvector('english', {document}), q.query) AS score "
+            f"FROM {table} t, q WHERE {active} AND {match}")
+
+
+# ==================== SCHEMA HOOKS ====================
+
+@event.listens_for(db.metadata, 'after_create')
+def create_search_index(target, connection, **kw):
+    """Create the FTS index along with the tables (db.create_all)"""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in SQLITE_DDL + SQLITE_BACKFILL:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
+
+
+# ==================== QUERYING ====================
+
+def fts_query(terms):
+    """Turn free text into a safe FTS5 query: every word must match, the last as a prefix"""
+    words = re.findall(r'\w+', terms)
+    if not words:
+        return None
+    quoted = ['"' + w + '"' for w in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _marked_html(value):
+    return html.escape((value or '').strip()).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search_documents(terms, doc_types=None, limit=20):
+    """Ranked search across news, forms, products and staff.
+
+    Returns [{type, id, title, snippet, score}]; title and snippet are
+    HTML-escaped with the matched terms wrapped in <mark>.
+    """
+    doc_types = [t for t in (doc_types or DOC_TYPES) if t in DOC_TYPES]
+    if not doc_types:
+        return []
+
+    if db.engine.dialect.name == 'sqlite':
+        query = fts_query(terms)
+        if not query:
+            return []
+        params = {'query': query, 'limit': limit, 'mark_start': MARK_START, 'mark_end': MARK_END}
+        type_filter = ''
+        if len(doc_types) < len(DOC_TYPES):
+            names = [f':type_{i}' for i in range(len(doc_types))]
+            type_filter = f"AND doc_type IN ({', '.join(names)})"
+            params.update({f'type_{i}': t for i, t in enumerate(doc_types)})
+        rows = db.session.execute(text(SQLITE_SEARCH.format(type_filter=type_filter)), params)
+    else:
+        if not terms.strip():
+            return []
+        hits = ' UNION ALL '.join(_pg_hits(t) for t in doc_types)
+        marks = f'StartSel={MARK_START}, StopSel={MARK_END}'
+        rows = db.session.execute(text(PG_SEARCH.format(hits=hits)), {
+            'query': terms,
+            'limit': limit,
+            'title_options': marks + ', HighlightAll=true',
+            'snippet_options': marks + ', MaxWords=24, MinWords=8'
+        })
+
+    return [{
+        'type': row.doc_type,
+        'id': int(row.doc_id),
+        'title': _marked_html(row.title),
+        'snippet': _marked_html(row.snippet),
+        'score': round(abs(float(row.score)), 4)
+    } for row in rows]
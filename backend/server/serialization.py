@@ -0,0 +1,107 @@
+from flask.json.provider import DefaultJSONProvider
+from datetime import date
+from operator import attrgetter
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used instead
+    orjson = None
+
+
+# ==================== SCHEMAS ====================
+
+class Schema:
+    """Declarative field list compiled once into a single attribute extractor.
+
+    Fields are attribute names, or (key, attribute, convert) tuples for values
+    derived from an attribute. The same schema dumps ORM objects and the Row
+    tuples of a query selecting `schema.columns(Model)`, so list endpoints can
+    skip building ORM objects entirely. Dates are left as date/datetime
+    objects; the JSON provider writes them in ISO 8601.
+    """
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self.keys = []
+        self.attributes = []
+        self._converters = []
+        for index, field in enumerate(fields):
+            key, attribute, convert = (field, field, None) if isinstance(field, str) else field
+            self.keys.append(key)
+            self.attributes.append(attribute)
+            if convert is not None:
+                self._converters.append((index, convert))
+
+        getter = attrgetter(*self.attributes)
+        # attrgetter returns a bare value, not a 1-tuple, for a single attribute
+        self._get = getter if len(self.attributes) > 1 else lambda obj: (getter(obj),)
+        self._subsets = {}
+
+    def dump(self, obj):
+        values = self._get(obj)
+        if self._converters:
+            values = list(values)
+            for index, convert in self._converters:
+                values[index] = convert(values[index])
+        return dict(zip(self.keys, values))
+
+    def dump_many(self, objs):
+        dump = self.dump
+        return [dump(obj) for obj in objs]
+
+    def only(self, keys):
+        """Schema limited to `keys` (e.g. from ?fields=), compiled once per key set"""
+        if keys is None:
+            return self
+        keys = frozenset(keys)
+        subset = self._subsets.get(keys)
+        if subset is None:
+            subset = Schema(*[f for f, k in zip(self.fields, self.keys) if k in keys])
+            self._subsets[keys] = subset
+        return subset
+
+    def without(self, *keys):
+        return self.only([k for k in self.keys if k not in keys])
+
+    def extend(self, *fields):
+        return Schema(*self.fields, *fields)
+
+    def columns(self, model):
+        """Mapped attributes to select so the result rows can be dumped"""
+        return [getattr(model, a) for a in dict.fromkeys(self.attributes)]
+
+
+# ==================== JSON PROVIDER ====================
+
+def _default(o):
+    # ISO 8601 like to_dict always produced, rather than Flask's HTTP dates
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """App JSON provider that encodes with orjson when it is installed"""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
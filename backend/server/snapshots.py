@@ -0,0 +1,117 @@
+from flask import current_app, request
+from concurrent.futures import ThreadPoolExecutor
+from cache import add_change_listener
+from models import db
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+# A snapshot is a public payload encoded once and kept on disk, so the endpoint
+# serving it never touches the database. It is rebuilt in the background after
+# any commit to one of its tables. Worker processes share the file, reloading
+# (and gzipping) it once whenever another process rewrites it.
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshots')
+
+
+class Snapshot:
+    def __init__(self, name, tables, build):
+        self.name = name
+        self.tables = set(tables)
+        self.build = build
+        self.app = None
+        self._lock = threading.Lock()
+        self._loaded = None  # (mtime, body, gzipped, etag)
+        self._pending = False
+        self._running = False
+
+    def init_app(self, app):
+        self.app = app
+        add_change_listener(self._tables_changed)
+
+    @property
+    def path(self):
+        return os.path.join(self.app.config['SNAPSHOT_FOLDER'], f'{self.name}.json')
+
+    # ---- rebuilding ----
+
+    def _tables_changed(self, tables):
+        if self.app is not None and self.tables & set(tables):
+            self.schedule()
+
+    def schedule(self):
+        """Queue a rebuild; changes arriving during one run it once more afterwards"""
+        with self._lock:
+            self._pending = True
+            if self._running:
+                return
+            self._running = True
+        _executor.submit(self._run)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                self._pending = False
+            try:
+                with self.app.app_context():
+                    self.rebuild()
+            except Exception as e:
+                self.app.logger.error(f'Failed to rebuild {self.name} snapshot: {e}')
+
+    def rebuild(self):
+        """Build, encode and atomically write the snapshot (needs an app context)"""
+        try:
+            body = current_app.json.dumps(self.build()).encode('utf-8') + b'\n'
+        finally:
+            db.session.remove()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, self.path)
+        return body
+
+    # ---- serving ----
+
+    def _load(self):
+        """Current (mtime, body, gzipped, etag), re-read when the file changed"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self.rebuild()
+            mtime = os.stat(self.path).st_mtime
+
+        loaded = self._loaded
+        if loaded is None or loaded[0] != mtime:
+            with open(self.path, 'rb') as f:
+                body = f.read()
+            loaded = self._loaded = (mtime, body, gzip.compress(body, 9), hashlib.sha1(body).hexdigest())
+
+        # Safety net for changes made outside this app's sessions
+        if time.time() - mtime > current_app.config['SNAPSHOT_MAX_AGE']:
+            self.schedule()
+        return loaded
+
+    def response(self):
+        mtime, body, gzipped, etag = self._load()
+
+        encoding = None
+        if request.accept_encodings['gzip'] > 0:
+            # Each encoding is its own representation, with its own ETag
+            body, etag, encoding = gzipped, etag + '-gzip', 'gzip'
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(body, mimetype='application/json')
+            response.content_encoding = encoding
+
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        return response
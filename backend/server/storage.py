@@ -0,0 +1,428 @@
+from flask import current_app, send_file, Request
+from flask.cli import with_appcontext
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+from urllib.parse import quote
+from collections import Counter
+from models import (
+    db, SliderImage, NewsUpdate, AboutContent, Award, StaffMember,
+    BoardMember, DownloadableForm
+)
+from images import Image, IMAGE_EXTENSIONS, build_variants, has_variants
+from cache import touch_tables
+import click
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+
+# Uploads are stored once per content hash under
+# UPLOAD_FOLDER/objects/<first two hex chars>/<sha256><ext>, so the same file
+# uploaded to several records (or folders) is kept on disk only once and its
+# URL never changes meaning.
+OBJECTS_DIR = 'objects'
+CHUNK_SIZE = 64 * 1024
+CONTENT_HASH_NAME = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]+)?$')
+
+# Every column that may hold a /static/uploads/... URL
+URL_COLUMNS = [
+    SliderImage.image_url,
+    NewsUpdate.featured_image,
+    AboutContent.image_url,
+    Award.icon_url,
+    StaffMember.photo_url,
+    BoardMember.photo_url,
+    DownloadableForm.file_url
+]
+
+
+# Magic-number prefixes of the file types we accept
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),  # docx, xlsx, pptx, odt
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),  # doc, xls
+    (b'\x00\x00\x01\x00', 'image/vnd.microsoft.icon')
+]
+# Brands of an ISO media 'ftyp' box (bytes 4-12) that mark HEIF images
+FTYP_BRANDS = {
+    b'avif': 'image/avif', b'avis': 'image/avif',
+    b'heic': 'image/heic', b'heix': 'image/heic', b'heim': 'image/heic', b'heis': 'image/heic',
+    b'mif1': 'image/heif', b'msf1': 'image/heif'
+}
+# SVG is text, so its <svg> tag may follow an XML declaration, comments and a doctype
+SNIFF_BYTES = 512
+
+IMAGE_TYPES = {
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp', 'image/tiff',
+    'image/svg+xml', 'image/vnd.microsoft.icon', 'image/heic', 'image/heif', 'image/avif'
+}
+DOCUMENT_TYPES = {'application/pdf', 'application/zip', 'application/x-ole-storage'}
+
+# Endpoints that accept documents; every other upload must be an image
+DOCUMENT_ENDPOINTS = {'admin_api.create_form', 'admin_api.update_form'}
+
+
+def sniff_type(head):
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp':
+        return FTYP_BRANDS.get(head[8:12])
+    for signature, mimetype in SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+
+    text = (head[3:] if head.startswith(b'\xef\xbb\xbf') else head).lstrip()
+    if text.startswith(b'<svg') or (text.startswith((b'<?xml', b'<!')) and b'<svg' in text):
+        return 'image/svg+xml'
+    return None
+
+
+def _extension(filename):
+    ext = os.path.splitext(secure_filename(filename))[1].lower()
+    return ext if len(ext) <= 10 else ''
+
+
+class UploadStream:
+    """Writable target for one uploaded file part.
+
+    Chunks go straight to a temp file in the content store while their size,
+    SHA-256 and sniffed MIME type are tracked, so memory stays at one chunk.
+    A part that is too large or of a disallowed type is rejected as soon as
+    that is known: its temp file is deleted and the rest is discarded.
+    """
+
+    def __init__(self, directory, allowed_types=None, max_size=None):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hasher = hashlib.sha256()
+        self._head = b''
+        self.allowed_types = allowed_types
+        self.max_size = max_size
+        self.size = 0
+        self.mimetype = None
+        self.error = None
+        self.status_code = None
+        self.stored = False
+
+    def write(self, data):
+        if self.error:
+            return len(data)
+
+        if len(self._head) < SNIFF_BYTES:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES and not self._check_type():
+                return len(data)
+
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self._reject(f'File exceeds the {round(self.max_size / (1024 * 1024), 2)} MB limit', 413)
+            return len(data)
+
+        self._hasher.update(data)
+        self._file.write(data)
+        return len(data)
+
+    def _check_type(self):
+        self.mimetype = sniff_type(self._head)
+        if self.allowed_types is not None and self.mimetype not in self.allowed_types:
+            self._reject('Unsupported file type', 415)
+            return False
+        return True
+
+    def _reject(self, message, status_code):
+        self.error = message
+        self.status_code = status_code
+        self._discard()
+
+    def _discard(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    @property
+    def digest(self):
+        return self._hasher.hexdigest()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # The parser seeks to 0 once the part is complete; small files are sniffed then
+        if self.mimetype is None and not self.error and len(self._head) < SNIFF_BYTES:
+            self._check_type()
+        if self.error:
+            return 0
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self.size if self.error else self._file.tell()
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def flush(self):
+        self._file.flush()
+
+    def finalize(self, path):
+        """Atomically move the temp file to `path`, or drop it if `path` already exists"""
+        self._file.flush()
+        if os.path.exists(path):
+            os.remove(self.tmp_path)
+            # Refresh mtime so a concurrent garbage collection keeps it
+            os.utime(path)
+        else:
+            # mkstemp creates 0600 files; uploads must be readable by a front proxy
+            os.chmod(self.tmp_path, 0o644)
+            os.replace(self.tmp_path, path)
+        self.stored = True
+
+    def close(self):
+        if self.stored:
+            self._file.close()
+        else:
+            self._discard()
+
+
+class UploadRequest(Request):
+    """Request class that streams admin file uploads into UploadStreams"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Empty file inputs still arrive as parts; they don't need the store
+        if not filename:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        allowed = IMAGE_TYPES | DOCUMENT_TYPES if self.endpoint in DOCUMENT_ENDPOINTS else IMAGE_TYPES
+        return UploadStream(
+            os.path.join(current_app.config['UPLOAD_FOLDER'], OBJECTS_DIR),
+            allowed_types=allowed,
+            max_size=current_app.config['UPLOAD_MAX_FILE_SIZE']
+        )
+
+
+def upload_error(files):
+    """Return (message, status) for the first rejected upload, or None"""
+    for file in files.values():
+        stream = file.stream
+        if isinstance(stream, UploadStream) and stream.error:
+            return stream.error, stream.status_code
+    return None
+
+
+def upload_size(file):
+    if isinstance(file.stream, UploadStream):
+        return file.stream.size
+    file.seek(0, os.SEEK_END)
+    return file.tell()
+
+
+def store_upload(file):
+    """Move an uploaded file into the content store.
+
+    Files parsed by UploadRequest were hashed while they were written, so this
+    is just an atomic rename to their hash name (or discarding the temp file
+    if that content is already stored). Anything else is copied in chunks
+    first. Returns (url, path).
+    """
+    objects_path = os.path.join(current_app.config['UPLOAD_FOLDER'], OBJECTS_DIR)
+
+    stream = file.stream
+    if not isinstance(stream, UploadStream):
+        stream = UploadStream(objects_path)
+        while True:
+            chunk = file.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            stream.write(chunk)
+
+    digest = stream.digest
+    # SVG is served by its extension, and scriptable under any text type but its own
+    ext = '.svg' if stream.mimetype == 'image/svg+xml' else _extension(file.filename)
+    name = digest + ext
+    shard_path = os.path.join(objects_path, digest[:2])
+    os.makedirs(shard_path, exist_ok=True)
+    path = os.path.join(shard_path, name)
+
+    try:
+        stream.finalize(path)
+    finally:
+        if stream is not file.stream:
+            stream.close()
+
+    return f'/static/uploads/{OBJECTS_DIR}/{digest[:2]}/{name}', path
+
+
+# ==================== SERVING ====================
+
+def send_upload(relative_path, download_name=None, immutable=True):
+    """Send an uploaded file with long-lived caching.
+
+    Every upload URL names unique content (a content hash, or a timestamped
+    legacy name), so responses are marked immutable for UPLOAD_CACHE_MAX_AGE.
+    Pass immutable=False when serving through a URL that can later point at
+    other content; clients then revalidate every time. Content-addressed
+    files use their hash as a strong ETag. Range and
+    conditional requests are handled by send_file, unless UPLOAD_OFFLOAD is
+    'x-accel', in which case nginx streams the file from UPLOAD_ACCEL_PREFIX.
+    ('x-sendfile' is handled by Flask itself through USE_X_SENDFILE.)
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    path = safe_join(upload_folder, relative_path)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    max_age = current_app.config['UPLOAD_CACHE_MAX_AGE']
+    match = CONTENT_HASH_NAME.match(os.path.basename(path))
+    etag = match.group(1) if match else True
+
+    if current_app.config['UPLOAD_OFFLOAD'] == 'x-accel':
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = current_app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/') + '/' + quote(relative_path)
+        response.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        # What nginx sends for the file as well; set here so callers can see revalidations
+        response.last_modified = os.path.getmtime(path)
+        if download_name:
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        if match:
+            response.set_etag(etag)
+    else:
+        response = send_file(path, as_attachment=bool(download_name), download_name=download_name,
+                             etag=etag, max_age=max_age)
+
+    if path.lower().endswith('.svg'):
+        # Uploaded SVGs are shown as images; never let one run scripts on our origin
+        response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+        # send_file set Expires from max_age; HTTP/1.0 caches would trust it over no-cache
+        del response.expires
+    return response
+
+
+# ==================== GARBAGE COLLECTION ====================
+
+def reference_counts():
+    """Number of rows referencing each uploaded file URL"""
+    counts = Counter()
+    for column in URL_COLUMNS:
+        rows = db.session.query(column, db.func.count()).filter(
+            column.like('/static/uploads/%')
+        ).group_by(column)
+        for url, count in rows:
+            counts[url] += count
+    return counts
+
+
+def _url_for_path(upload_folder, path):
+    return '/static/uploads/' + os.path.relpath(path, upload_folder).replace(os.sep, '/')
+
+
+def _remove_with_variants(path):
+    """Delete an upload and any resized variants generated from it"""
+    os.remove(path)
+    folder_path, filename = os.path.split(path)
+    stem = os.path.splitext(filename)[0]
+    variants_path = os.path.join(folder_path, 'variants')
+    if os.path.isdir(variants_path):
+        for variant in os.listdir(variants_path):
+            if variant.startswith(stem + '.'):
+                os.remove(os.path.join(variants_path, variant))
+
+
+def collect_garbage(grace_seconds=3600, dry_run=False):
+    """Remove uploaded files no row references any more.
+
+    Files modified within `grace_seconds` are kept, so an upload whose row
+    hasn't been committed yet (or a dedup hit that just touched it) survives.
+    Returns the list of removed (or, with dry_run, removable) paths.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    referenced = reference_counts()
+    cutoff = time.time() - grace_seconds
+    removed = []
+
+    for root, dirs, files in os.walk(upload_folder):
+        # Variants are removed together with their original
+        dirs[:] = [d for d in dirs if d != 'variants']
+        for filename in files:
+            path = os.path.join(root, filename)
+            if os.path.getmtime(path) > cutoff:
+                continue
+            if filename.startswith('.'):
+                # Only temp files of interrupted uploads are collected
+                if filename.startswith('.upload-'):
+                    if not dry_run:
+                        os.remove(path)
+                    removed.append(path)
+                continue
+            if referenced[_url_for_path(upload_folder, path)]:
+                continue
+            if not dry_run:
+                _remove_with_variants(path)
+            removed.append(path)
+    return removed
+
+
+@click.group('uploads')
+def uploads_cli():
+    """Manage uploaded files."""
+
+
+@uploads_cli.command('variants')
+@with_appcontext
+def variants_command():
+    """Build resized image variants for uploads that don't have them yet."""
+    if Image is None:
+        raise click.ClickException('Pillow is not installed')
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    built, changed_tables = 0, set()
+    for column in URL_COLUMNS:
+        if column is DownloadableForm.file_url:
+            continue
+        urls = db.session.query(column).filter(column.like('/static/uploads/%')).distinct()
+        for (url,) in urls:
+            path = os.path.join(upload_folder, *url[len('/static/uploads/'):].split('/'))
+            if (os.path.splitext(path)[1].lower() not in IMAGE_EXTENSIONS
+                    or not os.path.isfile(path) or has_variants(path)):
+                continue
+            try:
+                build_variants(path, url)
+            except Exception as e:
+                click.echo(f'Failed for {url}: {e}', err=True)
+                continue
+            built += 1
+            changed_tables.add(column.class_.__tablename__)
+
+    if changed_tables:
+        touch_tables(changed_tables)
+    click.echo(f'Built variants for {built} image(s)')
+
+
+@uploads_cli.command('gc')
+@click.option('--grace', default=3600, show_default=True, help='Keep files modified in the last N seconds.')
+@click.option('--dry-run', is_flag=True, help='Only list the files that would be removed.')
+@with_appcontext
+def gc_command(grace, dry_run):
+    """Delete uploads no longer referenced by any record."""
+    removed = collect_garbage(grace_seconds=grace, dry_run=dry_run)
+    for path in removed:
+        click.echo(('Would remove ' if dry_run else 'Removed ') + path)
+    click.echo(f'{len(removed)} unreferenced file(s)' + (' found' if dry_run else ' removed'))
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+from sqlalchemy import event
+
+# app.py configures itself from the environment at import time
+_tmp = tempfile.mkdtemp(prefix='chuna-tests-')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(_tmp, 'test.db'))
+os.environ.setdefault('SNAPSHOT_FOLDER', os.path.join(_tmp, 'snapshots'))
+os.environ.setdefault('RESPONSE_CACHE_ENABLED', 'false')
+os.environ.setdefault('RATELIMIT_ENABLED', 'false')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+from models import db, ProductCategory, Product, ProductFeature  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def query_count(app):
+    """A one-item list holding the number of statements run since it was last reset.
+
+    Only this thread's statements count, not those of background snapshot rebuilds.
+    """
+    count = [0]
+    thread = threading.get_ident()
+
+    def before_cursor_execute(*args):
+        if threading.get_ident() == thread:
+            count[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield count
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def add_products(categories, per_category, features=3):
+    """Add active products (with features) to each category, then commit"""
+    for category in categories:
+        start = len(category.products)
+        for i in range(start, start + per_category):
+            product = Product(
+                name=f'{category.name} {i}', slug=f'{category.slug}-{i}',
+                product_category_id=category.id, is_popular=i % 2 == 0
+            )
+            product.features = [ProductFeature(feature_text=f'Feature {j}', display_order=j) for j in range(features)]
+            db.session.add(product)
+    db.session.commit()
+
+
+@pytest.fixture
+def categories(app):
+    categories = [ProductCategory(name=f'Category {i}', slug=f'category-{i}', display_order=i) for i in range(5)]
+    db.session.add_all(categories)
+    db.session.commit()
+    return categories
@@ -0,0 +1,29 @@
+from conftest import add_products
+
+
+def get_counted(client, query_count, path):
+    query_count[0] = 0
+    response = client.get(path)
+    assert response.status_code == 200
+    return query_count[0]
+
+
+def test_products_query_count_is_constant(client, query_count, categories):
+    add_products(categories, 10)  # 50 products in 5 categories
+    queries = get_counted(client, query_count, '/api/public/products')
+    assert len(client.get('/api/public/products').get_json()['products']) == 50
+
+    add_products(categories, 10)  # twice as many products and features
+    assert get_counted(client, query_count, '/api/public/products') == queries
+    assert queries <= 4  # validators, categories, products, features
+
+
+def test_category_products_query_count_is_constant(client, query_count, categories):
+    path = '/api/public/products?category=category-1'
+    add_products(categories, 10)
+    queries = get_counted(client, query_count, path)
+    assert len(client.get(path).get_json()['products']) == 10
+
+    add_products(categories, 10)
+    assert get_counted(client, query_count, path) == queries
+    assert queries <= 4
@@ -0,0 +1,103 @@
+import re
+import threading
+from datetime import date
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from conftest import add_products
+from models import (
+    db, AdminUser, SliderImage, NewsUpdate, Department, StaffMember, BoardMember, DownloadableForm
+)
+from routes.public_api import home_payload
+
+# Small lists that are always read whole (a handful of rows each), so a scan is the right plan
+WHOLE_TABLE_READS = {'about_content', 'core_values', 'awards', 'product_categories'}
+
+PUBLIC_PATHS = [
+    '/api/public/about',
+    '/api/public/departments',
+    '/api/public/departments/loans',
+    '/api/public/directory',
+    '/api/public/board',
+    '/api/public/products',
+    '/api/public/products?category=category-1',
+    '/api/public/downloads',
+    '/api/public/downloads?category=Loans',
+    '/api/public/downloads?limit=5',
+    '/api/public/news',
+    '/api/public/news?limit=5',
+    '/api/public/news/1',
+]
+
+ADMIN_PATHS = [
+    '/api/admin/dashboard/stats',
+    '/api/admin/news?category=General',
+    '/api/admin/staff?department_id=1',
+    '/api/admin/board?category=Board',
+    '/api/admin/products?category_id=1',
+    '/api/admin/forms?category=Loans',
+    '/api/admin/analytics/downloads/top',
+    '/api/admin/analytics/downloads/forms/1',
+]
+
+
+@pytest.fixture
+def content(app, categories):
+    add_products(categories, 4)
+    department = Department(name='Loans', slug='loans', is_active=True)
+    db.session.add(department)
+    db.session.flush()
+    db.session.add_all([
+        SliderImage(image_url='/s.jpg', title='Slide', is_active=True, display_order=1),
+        StaffMember(department_id=department.id, full_name='Staff', position='Officer', is_active=True),
+        BoardMember(full_name='Member', position='Chair', category='Board', is_active=True),
+        NewsUpdate(title='News', content='Body', category='General', publish_date=date(2026, 1, 1)),
+        DownloadableForm(title='Form', file_url='/f.pdf', category='Loans', is_active=True),
+        AdminUser(username='admin', email='admin@example.com', password_hash='x', is_active=True),
+    ])
+    db.session.commit()
+
+
+@pytest.fixture
+def captured(app):
+    """SELECT statements (with parameters) run by this thread"""
+    statements = []
+    thread = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def full_scans(statement, parameters):
+    """Tables the plan reads row by row without an index"""
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    scans = []
+    for row in rows:
+        match = re.match(r'SCAN (\w+)(.*)', row[-1])
+        if match and match.group(1) in db.metadata.tables and 'INDEX' not in match.group(2):
+            scans.append(match.group(1))
+    return [t for t in scans if t not in WHOLE_TABLE_READS]
+
+
+def test_hot_queries_use_indexes(client, content, captured):
+    token = create_access_token(identity=str(AdminUser.query.filter_by(username='admin').one().id))
+    for path in PUBLIC_PATHS:
+        assert client.get(path).status_code == 200, path
+    for path in ADMIN_PATHS:
+        assert client.get(path, headers={'Authorization': f'Bearer {token}'}).status_code == 200, path
+    home_payload()
+    assert captured
+
+    problems = {}
+    for statement, parameters in captured:
+        scans = full_scans(statement, parameters)
+        if scans:
+            problems[' '.join(statement.split())[:200]] = scans
+    assert not problems, problems
@@ -34,51 +34,32 @@ const DepartmentsPage = () => {
     setError(null);
     
     try {
-      // Fetch all departments
-      const deptResponse = await fetch(`${API_BASE_URL}/departments`);
-      if (!deptResponse.ok) {
+      // Fetch all departments with their staff in one request
+      const response = await fetch(`${API_BASE_URL}/directory`);
+      if (!response.ok) {
         throw new Error('Failed to fetch departments');
       }
-      const deptData = await deptResponse.json();
+      const deptData = await response.json();
 
-      // Fetch staff for each department
-      const departmentsWithStaff = await Promise.all(
-        deptData.map(async (dept) => {
-          try {
-            const staffResponse = await fetch(`${API_BASE_URL}/departments/${dept.slug}`);
-            if (!staffResponse.ok) {
-              return { ...dept, members: [] };
-            }
-            const staffData = await staffResponse.json();
-            
-            // Process staff members
-            const members = (staffData.staff || []).map(member => ({
-              id: member.id,
-              name: member.full_name,
-              title: member.position,
-              email: member.email,
-              phone: member.phone,
-              image: member.photo_url ? 
-                (member.photo_url.startsWith('http') ? member.photo_url : `${FLASK_BASE_URL}${member.photo_url}`) 
-                : null,
-              education: member.education,
-              bio: member.bio,
-            }));
-
-            return {
-              id: dept.id,
-              name: dept.name,
-              description: dept.description,
-              keyRoles: dept.key_responsibilities ? 
-                dept.key_responsibilities.split('\n').filter(r => r.trim()) : [],
-              members: members
-            };
-          } catch (err) {
-            console.error(`Failed to fetch staff for ${dept.name}:`, err);
-            return { ...dept, members: [] };
-          }
-        })
-      );
+      const departmentsWithStaff = deptData.map((dept) => ({
+        id: dept.id,
+        name: dept.name,
+        description: dept.description,
+        keyRoles: dept.key_responsibilities ? 
+          dept.key_responsibilities.split('\n').filter(r => r.trim()) : [],
+        members: (dept.staff || []).map(member => ({
+          id: member.id,
+          name: member.full_name,
+          title: member.position,
+          email: member.email,
+          phone: member.phone,
+          image: member.photo_url ? 
+            (member.photo_url.startsWith('http') ? member.photo_url : `${FLASK_BASE_URL}${member.photo_url}`) 
+            : null,
+          education: member.education,
+          bio: member.bio,
+        }))
+      }));
 
       setDepartments(departmentsWithStaff);
     } catch (err) {
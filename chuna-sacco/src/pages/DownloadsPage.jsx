@@ -13,7 +13,6 @@ const DownloadsPage = () => {
   const [error, setError] = useState(null);
 
   const API_BASE_URL = 'http://localhost:5000/api/public';
-  const FLASK_BASE_URL = 'http://localhost:5000';
 
   // Fetch downloads from API
   useEffect(() => {
@@ -57,26 +56,8 @@ const DownloadsPage = () => {
     setDownloadingId(item.id);
     
     try {
-      // Log for debugging
-      console.log('Download item:', item);
-      console.log('File URL:', item.file_url);
-      
-      // Construct full URL for the file - properly encode the URL
-      const fileUrl = item.file_url.startsWith('http') 
-        ? item.file_url 
-        : `${FLASK_BASE_URL}${item.file_url}`;
-      
-      // Encode the URL properly to handle spaces and special characters
-      const encodedUrl = fileUrl.split('/').map((part, index) => {
-        // Don't encode the protocol (http://) or domain parts
-        if (index < 3) return part;
-        return encodeURIComponent(part);
-      }).join('/');
-      
-      console.log('Encoded file URL:', encodedUrl);
-      
-      // Fetch as blob to ensure binary download
-      const response = await fetch(encodedUrl);
+      // The backend sends the file and counts the download in one request
+      const response = await fetch(`${API_BASE_URL}/downloads/${item.id}/file`);
       
       if (!response.ok) {
         throw new Error(`Server responded with ${response.status}: ${response.statusText}`);
@@ -97,26 +78,14 @@ const DownloadsPage = () => {
       // Clean up the blob URL
       window.URL.revokeObjectURL(blobUrl);
       
-      // Track download count on backend
-      try {
-        await fetch(`${API_BASE_URL}/downloads/${item.id}/track`, { 
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json'
-          }
-        });
-        
-        // Update local state to reflect new count
-        setDownloads(prevDownloads => 
-          prevDownloads.map(d => 
-            d.id === item.id 
-              ? { ...d, download_count: (d.download_count || 0) + 1 }
-              : d
-          )
-        );
-      } catch (trackError) {
-        console.log('Could not track download:', trackError);
-      }
+      // Update local state to reflect new count
+      setDownloads(prevDownloads => 
+        prevDownloads.map(d => 
+          d.id === item.id 
+            ? { ...d, download_count: (d.download_count || 0) + 1 }
+            : d
+        )
+      );
       
     } catch (error) {
       console.error('Download failed:', error);
@@ -230,29 +230,15 @@ export default function StaffPage() {
     setError(null);
     
     try {
-      // Fetch departments
-      const deptResponse = await fetch(`${API_BASE_URL}/departments`);
-      if (!deptResponse.ok) {
+      // Fetch departments with their staff in one request
+      const response = await fetch(`${API_BASE_URL}/directory`);
+      if (!response.ok) {
         throw new Error('Failed to fetch departments');
       }
-      const deptData = await deptResponse.json();
+      const deptData = await response.json();
       setDepartments(deptData);
 
-      // Fetch staff from all departments
-      const staffPromises = deptData.map(async (dept) => {
-        try {
-          const response = await fetch(`${API_BASE_URL}/departments/${dept.slug}`);
-          if (!response.ok) return [];
-          const data = await response.json();
-          return data.staff || [];
-        } catch (err) {
-          console.error(`Failed to fetch staff for ${dept.name}:`, err);
-          return [];
-        }
-      });
-
-      const staffArrays = await Promise.all(staffPromises);
-      const allStaffData = staffArrays.flat();
+      const allStaffData = deptData.flatMap(dept => dept.staff || []);
       
       // Process image URLs - prepend FLASK_BASE_URL if needed
       const processedStaff = allStaffData.map(staff => ({